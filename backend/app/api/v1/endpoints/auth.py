@@ -12,6 +12,7 @@ from app.models.auth import (
     ExtendedUserResponse
 )
 from app.services.firebase_auth_service import firebase_auth_service
+from app.utils import auth_middleware
 from typing import Optional
 
 router = APIRouter()
@@ -23,16 +24,8 @@ async def signup(request: UserSignUpRequest):
     Create a new user account with Firebase Authentication
     """
     try:
-        # Check if user already exists
-        existing_user = firebase_auth_service.get_user_by_email(request.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email already exists"
-            )
-        
-        # Create new user
-        user = firebase_auth_service.create_user(
+        # Create new user; an existing email is reported by Firebase as a ValueError
+        user = await firebase_auth_service.create_user_async(
             email=request.email,
             password=request.password,
             display_name=request.display_name,
@@ -66,16 +59,8 @@ async def register_user(request: UserRegistrationRequest):
     Register a new user with complete profile including farm details
     """
     try:
-        # Check if user already exists
-        existing_user = firebase_auth_service.get_user_by_email(request.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email already exists"
-            )
-        
-        # Create new user with complete profile
-        user = firebase_auth_service.create_user_with_profile(
+        # Create new user with complete profile; an existing email is reported as a ValueError
+        user = await firebase_auth_service.create_user_with_profile_async(
             name=request.name,
             email=request.email,
             password=request.password,
@@ -111,21 +96,14 @@ async def login(request: UserLoginRequest):
     Authenticate user and return access token
     """
     try:
-        # Get user by email
-        user = firebase_auth_service.get_user_by_email(request.email)
+        # Look up the user and verify the password against the stored hash
+        user = await firebase_auth_service.authenticate(request.email, request.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
-        # Verify password (simplified - in production use Firebase Auth REST API)
-        if not firebase_auth_service.verify_password(request.email, request.password):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid email or password"
-            )
-        
         # Create access token
         access_token = firebase_auth_service.create_custom_token(user.uid)
         
@@ -150,16 +128,8 @@ async def verify_token(request: TokenVerificationRequest):
     Verify if a token is valid and return user information
     """
     try:
-        # Verify token
-        uid = firebase_auth_service.verify_token(request.token)
-        if not uid:
-            return TokenResponse(
-                valid=False,
-                error="Invalid token"
-            )
-        
-        # Get user information
-        user = firebase_auth_service.get_user_by_uid(uid)
+        # Verify token against the current Firebase Auth record
+        user = await auth_middleware.resolve_user(request.token)
         if not user:
             return TokenResponse(
                 valid=False,
@@ -183,64 +153,20 @@ async def verify_token(request: TokenVerificationRequest):
         )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(current_user: UserResponse = Depends(auth_middleware.get_current_user)):
     """
     Get current user information from token
     """
-    try:
-        # Extract token from Authorization header
-        token = credentials.credentials
-        
-        # Verify token
-        uid = firebase_auth_service.verify_token(token)
-        if not uid:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
-        # Get user information
-        user = firebase_auth_service.get_user_by_uid(uid)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        return user
-        
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=str(e)
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {str(e)}"
-        )
+    return current_user
 
 @router.get("/profile", response_model=ExtendedUserResponse)
-async def get_user_profile(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_user_profile(current_user: UserResponse = Depends(auth_middleware.get_current_user)):
     """
     Get current user profile with farm details and additional information
     """
     try:
-        # Extract token from Authorization header
-        token = credentials.credentials
-        
-        # Verify token
-        uid = firebase_auth_service.verify_token(token)
-        if not uid:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
         # Get extended user profile
-        user_profile = firebase_auth_service.get_user_profile(uid)
+        user_profile = await firebase_auth_service.get_user_profile_async(current_user.uid)
         if not user_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -249,11 +175,6 @@ async def get_user_profile(credentials: HTTPAuthorizationCredentials = Depends(s
         
         return user_profile
         
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=str(e)
-        )
     except HTTPException:
         raise
     except Exception as e:
@@ -263,24 +184,13 @@ async def get_user_profile(credentials: HTTPAuthorizationCredentials = Depends(s
         )
 
 @router.delete("/delete-account")
-async def delete_account(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def delete_account(current_user: UserResponse = Depends(auth_middleware.get_current_user)):
     """
     Delete current user account
     """
     try:
-        # Extract token from Authorization header
-        token = credentials.credentials
-        
-        # Verify token
-        uid = firebase_auth_service.verify_token(token)
-        if not uid:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
-        # Delete user
-        success = firebase_auth_service.delete_user(uid)
+        # Delete user; this also revokes its outstanding tokens in this process
+        success = await firebase_auth_service.delete_user_async(current_user.uid)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -289,11 +199,6 @@ async def delete_account(credentials: HTTPAuthorizationCredentials = Depends(sec
         
         return {"message": "Account deleted successfully"}
         
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=str(e)
-        )
     except HTTPException:
         raise
     except Exception as e:
@@ -303,38 +208,4 @@ async def delete_account(credentials: HTTPAuthorizationCredentials = Depends(sec
         )
 
 # Dependency to get current user (can be used in other endpoints if needed)
-async def get_current_user_dependency(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserResponse:
-    """
-    Dependency to get current authenticated user
-    Can be used in other endpoints that require authentication
-    """
-    try:
-        token = credentials.credentials
-        uid = firebase_auth_service.verify_token(token)
-        if not uid:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
-        user = firebase_auth_service.get_user_by_uid(uid)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        return user
-        
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=str(e)
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {str(e)}"
-        )
-
-
+get_current_user_dependency = auth_middleware.get_current_user
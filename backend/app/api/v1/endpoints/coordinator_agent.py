@@ -1,29 +1,177 @@
 # app/api/v1/endpoints/coordinator_agent.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.websockets import WebSocketState
+from typing import Optional
+import json
 # Import the new service
-from app.services.coordinator_service import get_holistic_advisory 
+from app.services.coordinator_service import get_holistic_advisory, stream_holistic_advisory
+from app.models.auth import UserResponse
+from app.services import tts_client
+from app.services.firebase_auth_service import firebase_auth_service
+from app.services.stt_client import stt_enabled, transcribe_stream, websocket_audio_frames
+from app.services.voice_pipeline import stream_voice_advisory
+from app.utils.auth_middleware import get_current_user_optional, resolve_user
 
 router = APIRouter()
 
 class AdvisoryRequest(BaseModel):
     query: str
-    lat: float
-    lon: float
-    state: str
-    district: str
-    market: str
-    commodity: str
+    # Omitted fields are taken from the signed-in farmer's profile
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    state: Optional[str] = None
+    district: Optional[str] = None
+    market: Optional[str] = None
+    commodity: Optional[str] = None
+
+async def _advisory_args(fields: dict, user: Optional[UserResponse]) -> dict:
+    """
+    Completes advisory arguments from the farmer's profile. Raises 422 if
+    fields are still missing and 502 if the profile cannot be loaded.
+    """
+    args = dict(fields)
+    if user is not None and any(value is None for value in args.values()):
+        try:
+            profile = await firebase_auth_service.get_user_profile_async(user.uid)
+        except ValueError as e:
+            print(f"Could not load farm profile for {user.uid}: {str(e)}")
+            raise HTTPException(status_code=502, detail="Could not load farm profile.")
+        farm = profile.farmDetails if profile else None
+        location = farm.location if farm else None
+        defaults = {
+            "lat": location.latitude if location else None,
+            "lon": location.longitude if location else None,
+            "state": location.state if location else None,
+            "district": location.district if location else None,
+            "market": location.market if location else None,
+            "commodity": farm.cropName if farm else None,
+        }
+        for name, value in defaults.items():
+            if args[name] is None:
+                args[name] = value
+
+    missing = [name for name, value in args.items() if value is None]
+    if missing:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Missing {', '.join(missing)}; send them or add them to your farm profile."
+        )
+    return args
 
 @router.post("/advisory", response_model=dict)
-async def get_advisory_endpoint(request: AdvisoryRequest):
+async def get_advisory_endpoint(request: AdvisoryRequest, user: Optional[UserResponse] = Depends(get_current_user_optional)):
     """
     Single entry point for getting holistic agricultural advisory.
     """
+    args = await _advisory_args(request.dict(), user)
     try:
-        result = await get_holistic_advisory(**request.dict())
+        result = await get_holistic_advisory(**args)
         return {"status": "success", "result": result}
     except Exception as e:
         # Add more specific error handling as needed
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/advisory/stream")
+async def stream_advisory_endpoint(request: AdvisoryRequest, user: Optional[UserResponse] = Depends(get_current_user_optional)):
+    """
+    Streaming variant of /advisory using Server-Sent Events.
+    Emits a "start" event immediately, a "tool" event as each data source is
+    fetched, "token" events with the advisory text, and a final "done" event.
+    """
+    args = await _advisory_args(request.dict(), user)
+
+    async def event_stream():
+        yield _format_sse("start", {"status": "accepted"})
+        try:
+            async for event in stream_holistic_advisory(**args):
+                yield _format_sse(event["event"], event["data"])
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            yield _format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream and delaying the first byte
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws/voice")
+async def voice_advisory_websocket(
+    websocket: WebSocket,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    market: Optional[str] = None,
+    commodity: Optional[str] = None,
+    language: Optional[str] = None,
+    token: Optional[str] = None,
+):
+    """
+    Voice mode of /advisory on one socket. As with /advisory, location fields
+    left out are taken from the farm profile of the user identified by
+    `token` (browsers cannot set headers on a WebSocket). The client streams
+    16-bit mono PCM as in /stt/ws/stt. The server sends {"type": "ready"} with
+    the audio format, "partial" transcripts while the farmer speaks, a
+    "transcript" when the utterance ends, then the advisory's "tool" and
+    "token" events interleaved with binary PCM for each spoken sentence, and
+    "done" after the last one. Utterances are answered one at a time.
+    """
+    await websocket.accept()
+    if not stt_enabled():
+        await websocket.send_json({"type": "error", "detail": "Speech recognition is not configured."})
+        await websocket.close(code=1011)
+        return
+
+    fields = {"lat": lat, "lon": lon, "state": state, "district": district, "market": market, "commodity": commodity}
+    try:
+        user = None
+        if token:
+            try:
+                user = await resolve_user(token)
+            except ValueError as e:
+                raise HTTPException(status_code=401, detail=str(e))
+            except Exception as e:
+                print(f"Voice advisory authentication failed: {str(e)}")
+                raise HTTPException(status_code=500, detail="Authentication failed")
+        location = await _advisory_args(fields, user)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        # Policy violation for bad credentials or input; internal error otherwise
+        await websocket.close(code=1011 if e.status_code >= 500 else 1008)
+        return
+
+    await websocket.send_json({
+        "type": "ready",
+        "audio_format": "pcm_s16le" if tts_client.tts_enabled() else None,
+        "sample_rate": tts_client.sample_rate,
+    })
+    try:
+        async for transcript in transcribe_stream(websocket_audio_frames(websocket), language):
+            if transcript["type"] == "partial":
+                await websocket.send_json(transcript)
+                continue
+            await websocket.send_json({"type": "transcript", "text": transcript["text"]})
+            async for item in stream_voice_advisory(transcript["text"], **location):
+                if isinstance(item, bytes):
+                    await websocket.send_bytes(item)
+                else:
+                    await websocket.send_json(item)
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        print(f"Voice advisory failed: {str(e)}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+        return
+
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close()
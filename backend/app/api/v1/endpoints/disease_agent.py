@@ -1,57 +1,124 @@
-from app.models.disease import DiseaseRequest, DiseaseResponse
-from app.services.gemini_client import call_gemini
-from app.utils.prompt_manager import render_prompt
-from app.services.gcs_service import upload_image_to_gcs
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from app.models.disease import DiseaseRequest, DiseaseResponse, ImageUploadResponse
+from app.services.disease_service import (
+    DISEASE_BATCH_CONCURRENCY,
+    DISEASE_BATCH_MAX_IMAGES,
+    DISEASE_BATCH_MAX_UPLOAD_BYTES,
+    DiagnosisError,
+    diagnose_batch,
+    diagnose_image,
+    store_image,
+)
+from app.services.storage_service import iter_upload
+from app.services.image_processing import IMAGE_MAX_UPLOAD_BYTES
+from app.services.image_index import image_index
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
+from typing import List, Union
+import asyncio
+import httpx
 import json
-import re
 import os
 
 load_dotenv()
 
-BUCKET_NAME = os.environ["BUCKET_NAME"]
 router = APIRouter()
 
-@router.post("/upload-image")
-def upload_image(file: UploadFile = File(...)):
+async def _read_upload(file: UploadFile, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> bytes:
     """
-    Uploads an image to GCP and returns the public URL.
+    Reads an upload into memory, failing with 413 once it exceeds `max_bytes`.
+    Batch uploads are buffered because their files are closed once the handler
+    returns, before the streamed diagnoses reach them.
     """
-    url = upload_image_to_gcs(file,BUCKET_NAME)
-    return {"image_url": url}
+    data = bytearray()
+    async for chunk in iter_upload(file):
+        data.extend(chunk)
+        if len(data) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image '{file.filename}' is too large.")
+    return bytes(data)
 
-@router.post("/predict", response_model=DiseaseResponse)
-def predict_disease(request: DiseaseRequest):
-    prompt = render_prompt(
-        name="disease_prompt",
-        image_url=request.image_url,
-        language =request.language or "en"
-    )
+def _file_size(file) -> int:
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
 
+@router.post("/upload-image", response_model=ImageUploadResponse)
+async def upload_image(file: UploadFile = File(...), language: str = "en"):
+    """
+    Uploads an image to storage and returns the public URL.
+    The image is downscaled, stripped of metadata and re-encoded before it is stored.
+    Identical or near-identical images map to the same stored object, and a
+    previous diagnosis in `language` is returned with the URL.
+    """
+    # The multipart parser has already spooled the upload (to disk past 1 MB);
+    # it is decoded straight from that file rather than copied into memory
+    size = file.size if file.size is not None else await asyncio.to_thread(_file_size, file.file)
+    if size > IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image '{file.filename}' is too large.")
+    try:
+        entry = await store_image(file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=502, detail=f"Error from storage provider: {e.response.text}")
 
+    diagnosis = image_index.get_diagnosis(entry.sha256, language)
+    return ImageUploadResponse(
+        image_url=entry.url,
+        image_hash=entry.sha256,
+        diagnosis=DiseaseResponse(**diagnosis) if diagnosis else None
+    )
 
-    # Call the AI model and parse the result
-    raw_result = call_gemini(prompt)
-    # Extract the JSON block using regex
-    print(f"Raw AI result: {raw_result}")
-    match = re.search(r"(?:json)?\s*(\{.*?\})\s*", raw_result, re.DOTALL)
-    if not match:
-        raise HTTPException(status_code=500, detail="No valid JSON block found in AI response.")
+@router.post("/predict", response_model=DiseaseResponse)
+async def predict_disease(request: DiseaseRequest):
+    try:
+        return await diagnose_image(request.image_url, request.language or "en")
+    except DiagnosisError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=400, detail=f"Could not fetch image: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
 
-    json_str = match.group(1)
+@router.post("/predict/batch")
+async def predict_disease_batch(
+    files: List[UploadFile] = File(default=[]),
+    image_urls: List[str] = Form(default=[]),
+    language: str = Form("en"),
+    concurrency: int = Form(DISEASE_BATCH_CONCURRENCY),
+):
+    """
+    Diagnoses many images in one request, given as uploads and/or image URLs.
+    Streams newline-delimited JSON: one "result" or "error" line per image as
+    soon as it is ready (with its input index; URLs come first, then uploads),
+    followed by a "summary" line grouping the image indexes by disease.
+    """
+    if not files and not image_urls:
+        raise HTTPException(status_code=400, detail="Provide at least one image URL or upload.")
+    if len(files) + len(image_urls) > DISEASE_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"A batch can hold at most {DISEASE_BATCH_MAX_IMAGES} images.")
 
-    print(f"Raw AI result: {json_str}")
-    try:
-        ai_result = json.loads(json_str)
-        if isinstance(ai_result, dict) and "disease" in ai_result:
-            # Ensure the response matches the DiseaseResponse model
-            if ai_result["recommendation"] is None:
-                return DiseaseResponse(**ai_result)
-            else:
-                return DiseaseResponse(**ai_result)
+    # Read uploads before streaming starts; the files are closed once the handler returns
+    images: List[Union[str, bytes]] = list(image_urls)
+    remaining = DISEASE_BATCH_MAX_UPLOAD_BYTES
+    for file in files:
+        if remaining < IMAGE_MAX_UPLOAD_BYTES:
+            try:
+                data = await _read_upload(file, remaining)
+            except HTTPException:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Uploads in a batch can total at most {DISEASE_BATCH_MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+                )
         else:
-            raise HTTPException(status_code=422, detail="Incomplete AI response structure")
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=500, detail=f"AI response is not valid JSON: {str(e)}")
+            data = await _read_upload(file)
+        remaining -= len(data)
+        images.append(data)
+    concurrency = max(1, min(concurrency, DISEASE_BATCH_CONCURRENCY))
+
+    async def ndjson():
+        async for item in diagnose_batch(images, language, concurrency):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
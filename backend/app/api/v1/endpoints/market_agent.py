@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from app.models.market import MarketRequest, MarketResponse
+from app.models.market import MarketRequest, MarketResponse, MarketTrendRequest, MarketTrendResponse
+from app.services.market_service import get_market_records
+from app.services.market_store import store_has_data
+from app.services.market_trends import get_market_trends
 import httpx
 import os
 
@@ -14,35 +17,37 @@ async def get_market_prices(request: MarketRequest):
     if not DATA_GOV_IN_API_KEY:
         raise HTTPException(status_code=500, detail="Market data API key is not configured.")
 
-    # CORRECTED URL: Removed markdown formatting
-    base_url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
-    params = {
-        "api-key": DATA_GOV_IN_API_KEY,
-        "format": "json",
-        "limit": 50, # Get more records to find the specific market
-        "filters[state]": request.state,
-        "filters[district]": request.district,
-        "filters[commodity]": request.commodity,
-    }
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # The API filters are sometimes broad, so we'll filter again for the specific market
-            filtered_records = [
-                record for record in data.get("records", []) 
-                if record.get("market", "").lower() == request.market.lower()
-            ]
-            
-            if not filtered_records:
-                 return MarketResponse(records=[])
-
-            return MarketResponse(records=filtered_records)
-
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Error from market data provider: {e.response.text}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
\ No newline at end of file
+    try:
+        # The API filters are sometimes broad, so records are filtered again for the specific market
+        filtered_records = await get_market_records(
+            request.state, request.district, request.market, request.commodity
+        )
+        
+        if not filtered_records:
+             return MarketResponse(records=[])
+
+        return MarketResponse(records=filtered_records)
+
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Error from market data provider: {e.response.text}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
+
+
+@router.post("/trends", response_model=MarketTrendResponse)
+async def get_market_price_trends(request: MarketTrendRequest):
+    """
+    Returns rolling modal-price averages, volatility and a comparison with other
+    markets in the district over the last `days` days.
+    """
+    if not await store_has_data():
+        raise HTTPException(status_code=503, detail="Market price history is not available yet.")
+
+    trends = await get_market_trends(
+        request.state, request.district, request.market, request.commodity,
+        days=request.days, window=request.window
+    )
+    if not trends["series"]:
+        raise HTTPException(status_code=404, detail="No price history found for this market and commodity.")
+
+    return MarketTrendResponse(market=request.market, commodity=request.commodity, **trends)
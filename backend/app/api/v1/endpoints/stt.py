@@ -1,12 +1,35 @@
-from fastapi import APIRouter, WebSocket
-from app.services.stt_client import speech_to_text
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from app.services.stt_client import stt_enabled, transcribe_stream, websocket_audio_frames
 
 router = APIRouter()
 
 @router.websocket("/ws/stt")
-async def websocket_stt(websocket: WebSocket):
+async def websocket_stt(websocket: WebSocket, language: Optional[str] = None):
+    """
+    Streams transcripts for live audio. The client sends 16-bit mono PCM frames
+    (STT_SAMPLE_RATE, 16 kHz by default) as binary messages, optionally
+    {"type": "end"} to close an utterance early and {"type": "close"} when done.
+    The server replies with {"type": "partial" | "final", "text": ...} messages.
+    """
     await websocket.accept()
-    while True:
-        audio_bytes = await websocket.receive_bytes()
-        text = await speech_to_text(audio_bytes)
-        await websocket.send_text(text)
\ No newline at end of file
+    if not stt_enabled():
+        await websocket.send_json({"type": "error", "detail": "Speech recognition is not configured."})
+        await websocket.close(code=1011)
+        return
+
+    try:
+        async for transcript in transcribe_stream(websocket_audio_frames(websocket), language):
+            await websocket.send_json(transcript)
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        print(f"STT stream failed: {str(e)}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.send_json({"type": "error", "detail": "Speech recognition failed."})
+            await websocket.close(code=1011)
+        return
+
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close()
@@ -1,12 +1,35 @@
-from fastapi import APIRouter, WebSocket
-from app.services.tts_client import text_to_speech
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from app.services import tts_client
+from app.services.tts_client import synthesize_stream, tts_enabled
 
 router = APIRouter()
 
 @router.websocket("/ws/tts")
 async def websocket_tts(websocket: WebSocket):
+    """
+    Speaks each text message sent by the client. Every reply starts with
+    {"type": "start", "format": "pcm_s16le", "sample_rate": ...}, followed by
+    one binary message of 16-bit mono PCM per sentence in order, and ends with
+    {"type": "end"}.
+    """
     await websocket.accept()
-    while True:
-        data = await websocket.receive_text()
-        audio_bytes = await text_to_speech(data)
-        await websocket.send_bytes(audio_bytes)
\ No newline at end of file
+    if not tts_enabled():
+        await websocket.send_json({"type": "error", "detail": "Speech synthesis is not configured."})
+        await websocket.close(code=1011)
+        return
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            await websocket.send_json({"type": "start", "format": "pcm_s16le", "sample_rate": tts_client.sample_rate})
+            async for chunk in synthesize_stream(text):
+                await websocket.send_bytes(chunk)
+            await websocket.send_json({"type": "end"})
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        print(f"TTS stream failed: {str(e)}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.send_json({"type": "error", "detail": "Speech synthesis failed."})
+            await websocket.close(code=1011)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.weather import WeatherRequest, WeatherResponse,WeatherAdviceResponse
-from app.services.reasoning_agent import generate_farming_advice_gemini
-from app.services.weather_cleaning_pipeline import clean_weather_data, summarize_for_llm
+from app.services.advice_digest import get_forecast_advice
+from app.services.reasoning_agent import stream_farming_advice_gemini
+from app.services.weather_cleaning_pipeline import summarize_forecast
+from app.services.weather_service import fetch_current_weather, fetch_forecast
 
 import httpx
 import os
@@ -18,37 +21,31 @@ async def get_weather_forecast(request: WeatherRequest):
     if not OPENWEATHER_API_KEY:
         raise HTTPException(status_code=500, detail="Weather API key is not configured.")
 
-    # Using the 'forecast' endpoint as you provided
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={request.lat}&lon={request.lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-
-            # The 'forecast' endpoint returns a 'list' of forecasts.
-            # We will use the first item in the list for the main response,
-            # but return the full list in 'details'.
-            if data.get("list"):
-                raise HTTPException(status_code=500, detail="Invalid response from weather provider.")
-
-            first_forecast = data
-            main_weather = first_forecast.get("weather", [{}])[0]
-            
-            # The location name is in the 'city' object for the forecast endpoint
-            location_name = data.get("city", {}).get("name", "Unknown Location")
-
-            return WeatherResponse(
-                location=location_name,
-                forecast=main_weather.get("description", "No forecast available."),
-                temperature_celsius=first_forecast.get("main", {}).get("temp", 0.0),
-                details=data # Return the full forecast data in the details field
-            )
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Error from weather provider: {e.response.text}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
+    try:
+        data = await fetch_current_weather(request.lat, request.lon)
+
+        # The 'forecast' endpoint returns a 'list' of forecasts.
+        # We will use the first item in the list for the main response,
+        # but return the full list in 'details'.
+        if data.get("list"):
+            raise HTTPException(status_code=500, detail="Invalid response from weather provider.")
+
+        first_forecast = data
+        main_weather = first_forecast.get("weather", [{}])[0]
+        
+        # The location name is in the 'city' object for the forecast endpoint
+        location_name = data.get("city", {}).get("name", "Unknown Location")
+
+        return WeatherResponse(
+            location=location_name,
+            forecast=main_weather.get("description", "No forecast available."),
+            temperature_celsius=first_forecast.get("main", {}).get("temp", 0.0),
+            details=data # Return the full forecast data in the details field
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Error from weather provider: {e.response.text}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
 
 
 @router.post("/forecast", response_model=WeatherResponse)
@@ -59,67 +56,68 @@ async def get_weather_forecast(request: WeatherRequest):
     if not OPENWEATHER_API_KEY:
         raise HTTPException(status_code=500, detail="Weather API key is not configured.")
 
-    # Using the 'forecast' endpoint as you provided
-    url = f"https://api.openweathermap.org/data/2.5/forecast?lat={request.lat}&lon={request.lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-
-            # The 'forecast' endpoint returns a 'list' of forecasts.
-            # We will use the first item in the list for the main response,
-            # but return the full list in 'details'.
-            if not data.get("list"):
-                raise HTTPException(status_code=500, detail="Invalid response from weather provider.")
-
-            first_forecast = data["list"][0]
-            main_weather = first_forecast.get("weather", [{}])[0]
-            
-            # The location name is in the 'city' object for the forecast endpoint
-            location_name = data.get("city", {}).get("name", "Unknown Location")
-
-            return WeatherResponse(
-                location=location_name,
-                forecast=main_weather.get("description", "No forecast available."),
-                temperature_celsius=first_forecast.get("main", {}).get("temp", 0.0),
-                details=data # Return the full forecast data in the details field
-            )
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Error from weather provider: {e.response.text}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
-
-
-@router.post("/forecast/advice", response_model=WeatherAdviceResponse)
-async def get_weather_forecast_with_advice(request: WeatherRequest, language: str = "en"):
-    if not OPENWEATHER_API_KEY:
-        raise HTTPException(status_code=500, detail="Weather API key is not configured.")
-    
-    url = f"https://api.openweathermap.org/data/2.5/forecast?lat={request.lat}&lon={request.lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        data = response.json()
+    try:
+        data = await fetch_forecast(request.lat, request.lon)
 
+        # The 'forecast' endpoint returns a 'list' of forecasts.
+        # We will use the first item in the list for the main response,
+        # but return the full list in 'details'.
         if not data.get("list"):
             raise HTTPException(status_code=500, detail="Invalid response from weather provider.")
-        
+
         first_forecast = data["list"][0]
         main_weather = first_forecast.get("weather", [{}])[0]
+        
+        # The location name is in the 'city' object for the forecast endpoint
         location_name = data.get("city", {}).get("name", "Unknown Location")
-        cleaned_data = clean_weather_data(data["list"])
-        summary = summarize_for_llm(cleaned_data)
-        # Get reasoning from Gemini
-        advice = await generate_farming_advice_gemini(summary, location_name, language)
 
-        return WeatherAdviceResponse(
+        return WeatherResponse(
             location=location_name,
             forecast=main_weather.get("description", "No forecast available."),
             temperature_celsius=first_forecast.get("main", {}).get("temp", 0.0),
-            # details=data,
-            advice=advice
+            details=data # Return the full forecast data in the details field
         )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Error from weather provider: {e.response.text}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
+
+
+@router.post("/forecast/advice", response_model=WeatherAdviceResponse)
+async def get_weather_forecast_with_advice(request: WeatherRequest, language: str = "en"):
+    """
+    Serves the precomputed advice digest for the request's grid cell, or
+    generates it live when the cell is not covered yet.
+    """
+    if not OPENWEATHER_API_KEY:
+        raise HTTPException(status_code=500, detail="Weather API key is not configured.")
+
+    try:
+        digest = await get_forecast_advice(request.lat, request.lon, language)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return WeatherAdviceResponse(**digest)
+
+
+@router.post("/forecast/advice/stream")
+async def stream_weather_forecast_advice(request: WeatherRequest, language: str = "en"):
+    """
+    Streams the farming advice as plain text while Gemini generates it, so the
+    first words reach the farmer without waiting for the full completion.
+    """
+    if not OPENWEATHER_API_KEY:
+        raise HTTPException(status_code=500, detail="Weather API key is not configured.")
+
+    data = await fetch_forecast(request.lat, request.lon)
+
+    if not data.get("list"):
+        raise HTTPException(status_code=500, detail="Invalid response from weather provider.")
+
+    location_name = data.get("city", {}).get("name", "Unknown Location")
+    summary = summarize_forecast(data)
 
+    return StreamingResponse(
+        stream_farming_advice_gemini(summary, location_name, language),
+        media_type="text/plain; charset=utf-8"
+    )
@@ -1,15 +1,55 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from app.api.v1 import api_router
+from app.services.http_clients import init_http_clients, close_http_clients
+from app.services.completion_cache import completion_cache
+from app.services.storage_service import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_BASE_URL
+from app.services.market_store import MARKET_INGEST_ENABLED, MARKET_INGEST_INTERVAL, ingest_market_prices
+from app.services.advice_digest import ADVICE_DIGEST_ENABLED, ADVICE_DIGEST_INTERVAL, digest_stats, refresh_advice_digests
+from app.services.scheduler import schedule_periodic, stop_scheduled_jobs
+from app.services.plant_classifier import start_classifier, stop_classifier
+from app.services.stt_client import start_stt, stop_stt
+from app.services.tts_client import start_tts, stop_tts
+from app.services.password_hashing import stop_password_hashing
+from app.utils.prompt_manager import load_prompts
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail at startup, not per request, if a prompt template is broken
+    load_prompts()
+    # Shared upstream clients live for the whole process so requests reuse pooled connections
+    await init_http_clients()
+    if MARKET_INGEST_ENABLED:
+        # Bulk-load mandi prices so market lookups never wait on data.gov.in
+        schedule_periodic("market-ingest", MARKET_INGEST_INTERVAL, ingest_market_prices)
+    if ADVICE_DIGEST_ENABLED:
+        # Pre-generates weather advice for active regions once per forecast refresh
+        schedule_periodic("advice-digest", ADVICE_DIGEST_INTERVAL, refresh_advice_digests)
+    # Loads the local healthy/unhealthy classifier when PLANT_CLASSIFIER_MODEL is set
+    await start_classifier()
+    # Loads the local speech recognition model when STT_MODEL is set
+    await start_stt()
+    # Loads the local Piper voice when TTS_MODEL is set
+    await start_tts()
+    yield
+    await stop_password_hashing()
+    await stop_tts()
+    await stop_stt()
+    await stop_classifier()
+    await stop_scheduled_jobs()
+    await close_http_clients()
+
 app = FastAPI(
     title="Krishi Maitri API",
     description="A multi-agent AI platform for actionable agricultural insights with Firebase Authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration for frontend integration
@@ -26,6 +66,15 @@ app.add_middleware(
 # API routes
 app.include_router(api_router, prefix="/api/v1")
 
+# Serve uploaded images when they are stored on the local filesystem
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(LOCAL_STORAGE_BASE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR), name="media")
+
 @app.get("/")
 def health_check():
-    return {"message": "Krishi Maitri API is running."}
\ No newline at end of file
+    return {"message": "Krishi Maitri API is running."}
+
+@app.get("/cache-stats")
+def cache_stats():
+    return {"gemini_completions": completion_cache.stats(), "advice_digests": digest_stats()}
@@ -6,6 +6,10 @@ class LocationDetails(BaseModel):
     address: Optional[str] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
+    # Used to look up mandi prices for the farmer's area
+    state: Optional[str] = None
+    district: Optional[str] = None
+    market: Optional[str] = None
 
 class FarmDetails(BaseModel):
     location: Optional[LocationDetails] = None
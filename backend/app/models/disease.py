@@ -7,5 +7,11 @@ class DiseaseRequest(BaseModel):
 
 class DiseaseResponse(BaseModel):
     status: str
-    disease: Optional[str]
-    recommendation: Optional[str]
\ No newline at end of file
+    disease: Optional[str] = None
+    recommendation: Optional[str] = None
+
+class ImageUploadResponse(BaseModel):
+    image_url: str
+    image_hash: Optional[str] = None
+    # Present when this image was already diagnosed in the requested language
+    diagnosis: Optional[DiseaseResponse] = None
@@ -19,4 +19,36 @@ class MarketPriceRecord(BaseModel):
     modal_price: str
 
 class MarketResponse(BaseModel):
-    records: List[MarketPriceRecord]
\ No newline at end of file
+    records: List[MarketPriceRecord]
+
+class MarketTrendRequest(BaseModel):
+    state: str
+    district: str
+    market: str
+    commodity: str
+    days: int = Field(30, ge=2, le=365, description="Length of the date window, ending today")
+    window: int = Field(7, ge=1, le=60, description="Number of trading days in the rolling average")
+
+class MarketTrendPoint(BaseModel):
+    arrival_date: str
+    modal_price: float
+    rolling_avg: float
+
+class MarketComparison(BaseModel):
+    market: str
+    latest_modal_price: float
+    average_modal_price: float
+    diff_from_selected_pct: Optional[float] = None
+
+class MarketTrendResponse(BaseModel):
+    market: str
+    commodity: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    latest_modal_price: Optional[float] = None
+    average_modal_price: Optional[float] = None
+    rolling_avg: Optional[float] = None
+    change_pct: Optional[float] = None
+    volatility_pct: Optional[float] = None
+    series: List[MarketTrendPoint] = []
+    nearby_markets: List[MarketComparison] = []
@@ -0,0 +1,125 @@
+import asyncio
+import os
+from typing import List, Tuple
+from app.services.cache import TTLCache
+from app.services.reasoning_agent import generate_farming_advice_gemini
+from app.services.weather_cleaning_pipeline import summarize_forecast
+from app.services.weather_service import FORECAST_CACHE_TTL, OPENWEATHER_API_KEY, fetch_forecast, geo_cell, refresh_forecast
+
+# Each run fetches a fresh forecast per cell (and updates the forecast cache with
+# it), so digests lag the provider by at most one interval. They are kept for
+# two cycles, so a slow or failed run still leaves the previous digest to serve.
+ADVICE_DIGEST_INTERVAL = float(os.getenv("ADVICE_DIGEST_INTERVAL", str(FORECAST_CACHE_TTL)))
+ADVICE_DIGEST_ENABLED = os.getenv("ADVICE_DIGEST_ENABLED", "true").lower() == "true" and bool(OPENWEATHER_API_KEY)
+ADVICE_DIGEST_MAX_ENTRIES = int(os.getenv("ADVICE_DIGEST_MAX_ENTRIES", "2000"))
+ADVICE_DIGEST_CONCURRENCY = int(os.getenv("ADVICE_DIGEST_CONCURRENCY", "4"))
+# A (cell, language) pair stays in the job's working set this long after its last request
+ADVICE_DIGEST_ACTIVE_TTL = float(os.getenv("ADVICE_DIGEST_ACTIVE_TTL", str(24 * 60 * 60)))
+# Regions always kept warm, as "lat,lon;lat,lon", in each of ADVICE_DIGEST_LANGUAGES
+ADVICE_DIGEST_REGIONS = os.getenv("ADVICE_DIGEST_REGIONS", "")
+ADVICE_DIGEST_LANGUAGES = [lang.strip() for lang in os.getenv("ADVICE_DIGEST_LANGUAGES", "en").split(",") if lang.strip()]
+# Only requests in these languages join the job's working set; others are answered live
+ADVICE_SUPPORTED_LANGUAGES = {
+    lang.strip() for lang in os.getenv("ADVICE_SUPPORTED_LANGUAGES", "en,hi,mr,gu,pa,bn,or,ta,te,kn,ml").split(",") if lang.strip()
+} | set(ADVICE_DIGEST_LANGUAGES)
+
+_digests = TTLCache(maxsize=ADVICE_DIGEST_MAX_ENTRIES, ttl=2 * ADVICE_DIGEST_INTERVAL)
+_active = TTLCache(maxsize=ADVICE_DIGEST_MAX_ENTRIES, ttl=ADVICE_DIGEST_ACTIVE_TTL)
+
+
+def _configured_cells() -> List[Tuple[float, float]]:
+    cells = []
+    for region in ADVICE_DIGEST_REGIONS.split(";"):
+        if not region.strip():
+            continue
+        try:
+            lat, lon = (float(part) for part in region.split(","))
+        except ValueError:
+            print(f"Ignoring malformed ADVICE_DIGEST_REGIONS entry: {region!r}")
+            continue
+        cells.append(geo_cell(lat, lon))
+    return cells
+
+
+async def build_forecast_advice(lat: float, lon: float, language: str = "en") -> dict:
+    """
+    Fetches the forecast for (lat, lon) and generates farming advice for it.
+    Returns the fields of WeatherAdviceResponse. Raises ValueError if the
+    provider returned no forecast entries or no advice could be generated.
+    """
+    return await advice_from_forecast(await fetch_forecast(lat, lon), language)
+
+
+async def advice_from_forecast(data: dict, language: str = "en") -> dict:
+    """Generates the advice digest for an already fetched forecast."""
+    if not data.get("list"):
+        raise ValueError("Invalid response from weather provider.")
+
+    first_forecast = data["list"][0]
+    main_weather = first_forecast.get("weather", [{}])[0]
+    location_name = data.get("city", {}).get("name", "Unknown Location")
+    advice = await generate_farming_advice_gemini(summarize_forecast(data), location_name, language)
+    return {
+        "location": location_name,
+        "forecast": main_weather.get("description", "No forecast available."),
+        "temperature_celsius": first_forecast.get("main", {}).get("temp", 0.0),
+        "advice": advice,
+    }
+
+
+async def get_forecast_advice(lat: float, lon: float, language: str = "en") -> dict:
+    """
+    Returns the advice digest for the grid cell containing (lat, lon), generating
+    it live if the background job has not covered this cell yet. Every request
+    marks its cell active so the next scheduled run keeps it warm.
+    """
+    key = (geo_cell(lat, lon), language)
+    if language in ADVICE_SUPPORTED_LANGUAGES:
+        _active.set(key, True)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = await build_forecast_advice(*key[0], language)
+        _digests.set(key, digest)
+    return digest
+
+
+async def refresh_advice_digests():
+    """
+    Regenerates the digest of every recently requested or configured (cell,
+    language) pair from a freshly fetched forecast, fetched once per cell.
+    """
+    languages_by_cell = {}
+    for cell, language in _active.keys():
+        languages_by_cell.setdefault(cell, set()).add(language)
+    for cell in _configured_cells():
+        languages_by_cell.setdefault(cell, set()).update(ADVICE_DIGEST_LANGUAGES)
+    if not languages_by_cell:
+        return
+
+    semaphore = asyncio.Semaphore(ADVICE_DIGEST_CONCURRENCY)
+
+    async def refresh(key: tuple, forecast: dict) -> bool:
+        async with semaphore:
+            try:
+                _digests.set(key, await advice_from_forecast(forecast, key[1]))
+                return True
+            except Exception as e:
+                print(f"Advice digest for {key} failed: {str(e)}")
+                return False
+
+    async def refresh_cell(cell: tuple, languages: set) -> int:
+        try:
+            async with semaphore:
+                forecast = await refresh_forecast(*cell)
+        except Exception as e:
+            print(f"Forecast refresh for {cell} failed: {str(e)}")
+            return 0
+        return sum(await asyncio.gather(*(refresh((cell, language), forecast) for language in languages)))
+
+    results = await asyncio.gather(*(refresh_cell(cell, languages) for cell, languages in languages_by_cell.items()))
+    total = sum(len(languages) for languages in languages_by_cell.values())
+    print(f"Refreshed {sum(results)}/{total} advice digests.")
+
+
+def digest_stats() -> dict:
+    return {"digests": len(_digests), "active_cells": len(_active)}
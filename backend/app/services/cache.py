@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    In-process cache with a per-entry TTL and an LRU bound on the number of entries.
+
+    `get_or_load` collapses concurrent misses for the same key into a single call
+    of the loader: the first caller starts the load as a task and everyone else
+    awaits that same task. The load is shielded, so a cancelled caller does not
+    abort a fetch other callers are waiting on.
+
+    With `stale_ttl` set, an expired entry is kept for that much longer and
+    `get_or_load` serves it immediately while refreshing it in the background.
+
+    With `max_bytes` set, values must support len() and the cache also evicts
+    least recently used entries once their total length exceeds it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def _size(self, value: Any) -> int:
+        return len(value) if self.max_bytes is not None else 0
+
+    def _remove(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= self._size(entry[1])
+
+    def _lookup(self, key: Hashable):
+        """Returns (value, is_fresh), or (_MISSING, False) if absent or past the stale window."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING, False
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at + self.stale_ttl <= now:
+            self._remove(key)
+            return _MISSING, False
+        self._data.move_to_end(key)
+        return value, expires_at > now
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value, fresh = self._lookup(key)
+        return value if fresh else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._remove(key)
+        size = self._size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._bytes += size
+        while len(self._data) > self.maxsize or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            self._remove(next(iter(self._data)))
+
+    def keys(self) -> list:
+        """Keys of the entries that are still fresh, least recently used first."""
+        now = time.monotonic()
+        return [key for key, (expires_at, _) in self._data.items() if expires_at > now]
+
+    def invalidate(self, key: Hashable):
+        self._remove(key)
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value, fresh = self._lookup(key)
+        if fresh:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._load_done(key, t))
+        if value is not _MISSING:
+            # Stale hit: the refresh keeps running in the background
+            return value
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    def _load_done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark failures as retrieved even if nobody awaited the task
+        # (every waiter cancelled, or a background stale refresh)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Cache load for {key!r} failed: {task.exception()}")
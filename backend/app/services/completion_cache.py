@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+from dotenv import load_dotenv
+from app.services.cache import TTLCache
+
+load_dotenv()
+
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "true").lower() == "true"
+GEMINI_CACHE_TTL = float(os.getenv("GEMINI_CACHE_TTL", str(24 * 60 * 60)))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "10000"))
+# "memory" keeps completions in-process only; "sqlite" also persists them to
+# GEMINI_CACHE_PATH so they survive restarts.
+GEMINI_CACHE_BACKEND = os.getenv("GEMINI_CACHE_BACKEND", "memory")
+GEMINI_CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", "data/gemini_cache.db")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def completion_key(model: str, prompt: str, *parts: str) -> str:
+    """Hashes the model name and the whitespace-normalized prompt (plus any extra parts)."""
+    normalized = _WHITESPACE.sub(" ", prompt).strip()
+    digest = hashlib.sha256()
+    for piece in (model, normalized, *parts):
+        digest.update(piece.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SQLiteCompletionStore:
+    """Disk-backed completion store with TTL expiry and an entry bound evicting least recently used."""
+
+    def __init__(self, path: str, ttl: float, maxsize: int):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions (last_access)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)", (key, value, now + self.ttl, now)
+            )
+            self._conn.execute("DELETE FROM completions WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+class CompletionCache:
+    """
+    Cache of LLM completions keyed by completion_key(). An in-memory LRU sits in
+    front of the optional SQLite store, and concurrent misses for the same key
+    share one generation. Failed generations are not cached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, backend: str = "memory", path: Optional[str] = None):
+        self.enabled = GEMINI_CACHE_ENABLED
+        self.backend = backend
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._disk = SQLiteCompletionStore(path, ttl, maxsize) if backend == "sqlite" else None
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is None and self._disk is not None:
+            value = await asyncio.to_thread(self._disk.get, key)
+            if value is not None:
+                self._memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str):
+        self._memory.set(key, value)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value)
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        if not self.enabled:
+            return await generate()
+        cached = await self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+
+        async def load():
+            value = await generate()
+            if self._disk is not None:
+                await asyncio.to_thread(self._disk.set, key, value)
+            return value
+
+        return await self._memory.get_or_load(key, load)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+completion_cache = CompletionCache(
+    ttl=GEMINI_CACHE_TTL,
+    maxsize=GEMINI_CACHE_MAX_ENTRIES,
+    backend=GEMINI_CACHE_BACKEND,
+    path=GEMINI_CACHE_PATH,
+)
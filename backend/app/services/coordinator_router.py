@@ -5,10 +5,8 @@ from app.services.stt_client import speech_to_text
 
 async def route_request(task_type: str, payload: dict):
     if task_type == "disease_diagnosis":
-        # This should call the predict_disease logic, which uses Gemini
-        # This is a simplified example. In reality, you'd call the endpoint or refactor the logic.
-        from app.api.v1.endpoints.disease_agent import predict_disease_logic
-        return predict_disease_logic(payload)
+        from app.services.disease_service import diagnose_image
+        return await diagnose_image(payload["image_url"], payload.get("language", "en"))
     elif task_type == "generate_voice":
         text = payload.get("text", "")
         return await text_to_speech(text)
@@ -1,81 +1,155 @@
 # app/services/coordinator_service.py
 
+import asyncio
 import httpx
 import os
+import time
+from typing import AsyncIterator
 from dotenv import load_dotenv
 from app.utils.prompt_manager import render_prompt
-from app.services.gemini_client import call_gemini
+from app.services.gemini_client import call_gemini_async, stream_gemini
+from app.services.market_service import get_market_records
+from app.services.market_store import store_has_data
+from app.services.market_trends import get_market_trends, summarize_trends_for_llm
+from app.services.weather_cleaning_pipeline import summarize_forecast
+from app.services.weather_service import fetch_forecast
 # We will add the RAG tool here in Task 3
 # from .rag_service import query_community_knowledge 
 
 load_dotenv()
 
-DATA_GOV_IN_API_KEY = os.getenv("DATA_GOV_IN_API_KEY")
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+# Per-tool deadlines (seconds). A tool that misses its deadline is dropped from
+# the prompt instead of holding back the whole advisory.
+WEATHER_TOOL_TIMEOUT = float(os.getenv("WEATHER_TOOL_TIMEOUT", "4"))
+MARKET_TOOL_TIMEOUT = float(os.getenv("MARKET_TOOL_TIMEOUT", "6"))
 
 # Tool 1: Get Weather Data
 async def get_weather_data(lat: float, lon: float):
-    """Fetches weather data from OpenWeatherMap."""
-    url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            print(f"Weather API HTTP error: {e.response.text}")
-            return {"error": "Could not fetch weather data."}
-        except Exception as e:
-            print(f"Weather API error: {str(e)}")
-            return {"error": "An unexpected error occurred while fetching weather data."}
+    """Fetches the OpenWeatherMap forecast, condensed to one line per day."""
+    try:
+        return {"summary": summarize_forecast(await fetch_forecast(lat, lon))}
+    except httpx.HTTPStatusError as e:
+        print(f"Weather API HTTP error: {e.response.text}")
+        return {"error": "Could not fetch weather data."}
+    except Exception as e:
+        print(f"Weather API error: {str(e)}")
+        return {"error": "An unexpected error occurred while fetching weather data."}
 
 # Tool 2: Get Market Data
 async def get_market_data(state: str, district: str, market: str, commodity: str):
-    """Fetches market price data from data.gov.in."""
-    base_url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
-    params = {
-        "api-key": DATA_GOV_IN_API_KEY,
-        "format": "json",
-        "limit": 10, # Fetch recent records
-        "filters[state]": state,
-        "filters[district]": district,
-        "filters[market]": market,
-        "filters[commodity]": commodity,
+    """Fetches market prices, as compact trend figures once the local mandi store has history."""
+    try:
+        if await store_has_data():
+            trends = await get_market_trends(state, district, market, commodity)
+            return {"summary": summarize_trends_for_llm(trends, market, commodity)}
+        records = await get_market_records(state, district, market, commodity)
+        return {"records": records}
+    except httpx.HTTPStatusError as e:
+        print(f"Market Data API HTTP error: {e.response.text}")
+        return {"error": "Could not fetch market data."}
+    except Exception as e:
+        print(f"Market Data API error: {str(e)}")
+        return {"error": "An unexpected error occurred while fetching market data."}
+
+# Fan-out stage
+async def _run_tool(name: str, coro, timeout: float) -> dict:
+    """Runs a single tool under its own deadline and records how long it took."""
+    start = time.perf_counter()
+    try:
+        data = await asyncio.wait_for(coro, timeout=timeout)
+        status = "error" if isinstance(data, dict) and "error" in data else "ok"
+    except asyncio.TimeoutError:
+        data = {"error": f"{name} data not available in time."}
+        status = "timeout"
+    except Exception as e:
+        print(f"Tool '{name}' failed: {str(e)}")
+        data = {"error": f"An unexpected error occurred while fetching {name} data."}
+        status = "error"
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    print(f"Tool '{name}' finished with status={status} in {elapsed_ms}ms")
+    return {"name": name, "data": data, "status": status, "elapsed_ms": elapsed_ms}
+
+async def run_tools(tools: dict) -> dict:
+    """
+    Runs every tool concurrently. `tools` maps a tool name to a
+    (coroutine, timeout) pair; the result maps each name to the outcome of
+    `_run_tool`, so slow tools surface as partial data rather than failures.
+    """
+    results = await asyncio.gather(
+        *(_run_tool(name, coro, timeout) for name, (coro, timeout) in tools.items())
+    )
+    return {result["name"]: result for result in results}
+
+async def iter_tools(tools: dict) -> AsyncIterator[dict]:
+    """Like run_tools, but yields each tool outcome as soon as it completes."""
+    tasks = [
+        asyncio.create_task(_run_tool(name, coro, timeout))
+        for name, (coro, timeout) in tools.items()
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer may stop early (e.g. client disconnect); don't leak tool calls
+        for task in tasks:
+            task.cancel()
+
+def _advisory_tools(lat: float, lon: float, state: str, district: str, market: str, commodity: str) -> dict:
+    return {
+        "weather": (get_weather_data(lat, lon), WEATHER_TOOL_TIMEOUT),
+        "market": (get_market_data(state, district, market, commodity), MARKET_TOOL_TIMEOUT),
+        # In Task 3, we will add the community knowledge tool call here
+        # "community": (query_community_knowledge(query), COMMUNITY_TOOL_TIMEOUT),
+    }
+
+def _render_advisory_prompt(query: str, tool_results: dict) -> str:
+    return render_prompt(
+        name="advisory_prompt",
+        query=query,
+        weather_data=str(tool_results["weather"]["data"]),
+        market_data=str(tool_results["market"]["data"]),
+        # community_insights=str(tool_results["community"]["data"]) # Add this in Task 3
+    )
+
+def _tool_timings(tool_results: dict) -> dict:
+    return {
+        name: {"status": result["status"], "elapsed_ms": result["elapsed_ms"]}
+        for name, result in tool_results.items()
     }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(base_url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            print(f"Market Data API HTTP error: {e.response.text}")
-            return {"error": "Could not fetch market data."}
-        except Exception as e:
-            print(f"Market Data API error: {str(e)}")
-            return {"error": "An unexpected error occurred while fetching market data."}
 
 # Main Orchestrator Logic
 async def get_holistic_advisory(query: str, lat: float, lon: float, state: str, district: str, market: str, commodity: str) -> dict:
     """
     The main coordinator function. It calls tools and synthesizes a response.
     """
-    # 1. Fetch data from all sources concurrently (or sequentially for simplicity first)
-    weather_data = await get_weather_data(lat, lon)
-    market_data = await get_market_data(state, district, market, commodity)
-
-    # In Task 3, we will add the community knowledge tool call here
-    # community_insights = await query_community_knowledge(query)
+    # 1. Fetch data from all sources concurrently, each under its own deadline
+    tool_results = await run_tools(_advisory_tools(lat, lon, state, district, market, commodity))
 
     # 2. Render the prompt with all the fetched data
-    prompt = render_prompt(
-        name="advisory_prompt",
-        query=query,
-        weather_data=str(weather_data),
-        market_data=str(market_data),
-        # community_insights=str(community_insights) # Add this in Task 3
-    )
+    prompt = _render_advisory_prompt(query, tool_results)
 
     # 3. Call Gemini to get the final synthesized response
-    final_response = call_gemini(prompt)
+    final_response = await call_gemini_async(prompt)
+
+    return {"response": final_response, "tool_timings": _tool_timings(tool_results)}
+
+async def stream_holistic_advisory(query: str, lat: float, lon: float, state: str, district: str, market: str, commodity: str) -> AsyncIterator[dict]:
+    """
+    Streaming variant of get_holistic_advisory. Yields progress events as
+    {"event": ..., "data": {...}}: one "tool" event per finished tool, then
+    "token" events carrying the advisory text as Gemini generates it, and a
+    final "done" event with the tool timings.
+    """
+    tool_results = {}
+    async for result in iter_tools(_advisory_tools(lat, lon, state, district, market, commodity)):
+        tool_results[result["name"]] = result
+        yield {
+            "event": "tool",
+            "data": {"tool": result["name"], "status": result["status"], "elapsed_ms": result["elapsed_ms"]},
+        }
+
+    prompt = _render_advisory_prompt(query, tool_results)
+    async for chunk in stream_gemini(prompt):
+        yield {"event": "token", "data": {"text": chunk}}
 
-    return {"response": final_response}
\ No newline at end of file
+    yield {"event": "done", "data": {"tool_timings": _tool_timings(tool_results)}}
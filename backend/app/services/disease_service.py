@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import httpx
+from typing import AsyncIterator, BinaryIO, List, Tuple, Union
+from app.models.disease import DiseaseResponse
+from app.services.gemini_client import GEMINI_VISION_MODEL, call_gemini_with_image, json_generation_config
+from app.services.http_clients import BlockedAddressError, PayloadTooLargeError, get_http_client, read_limited
+from app.services.image_index import ImageEntry, image_index
+from app.services.image_processing import IMAGE_MAX_UPLOAD_BYTES, preprocess_image_async
+from app.services.plant_classifier import PLANT_CLASSIFIER_HEALTHY_THRESHOLD, healthy_probability
+from app.services.storage_service import get_storage_backend
+from app.services.structured_output import parse_model
+from app.utils.prompt_manager import render_prompt
+
+# Images diagnosed in parallel per batch request; Gemini calls are additionally
+# capped process-wide by GEMINI_MAX_CONCURRENCY
+DISEASE_BATCH_CONCURRENCY = int(os.getenv("DISEASE_BATCH_CONCURRENCY", "4"))
+DISEASE_BATCH_MAX_IMAGES = int(os.getenv("DISEASE_BATCH_MAX_IMAGES", "50"))
+# Uploads in a batch are buffered before streaming starts; this caps their total size
+DISEASE_BATCH_MAX_UPLOAD_BYTES = int(os.getenv("DISEASE_BATCH_MAX_UPLOAD_MB", "100")) * 1024 * 1024
+IMAGE_FETCH_MAX_REDIRECTS = int(os.getenv("IMAGE_FETCH_MAX_REDIRECTS", "5"))
+
+# Shape of the diagnosis Gemini is asked to return in JSON mode
+DISEASE_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "status": {"type": "STRING", "enum": ["healthy", "unhealthy"]},
+        "disease": {"type": "STRING", "nullable": True},
+        "recommendation": {"type": "STRING", "nullable": True},
+    },
+    "required": ["status"],
+}
+
+
+class DiagnosisError(Exception):
+    """Raised when the image cannot be diagnosed; carries the HTTP status to report."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _check_url(url: httpx.URL):
+    if url.scheme not in ("http", "https"):
+        raise DiagnosisError(400, "Image URL must use http or https.")
+    if not url.host:
+        raise DiagnosisError(400, "Image URL has no host.")
+
+
+async def download_image(image_url: str) -> bytes:
+    """
+    Downloads an external image for diagnosis. Only http(s) URLs are fetched,
+    every redirect hop is checked the same way, and the "images" client only
+    connects to public addresses. The body is read as a stream that stops at
+    IMAGE_MAX_UPLOAD_BYTES.
+    """
+    try:
+        url = httpx.URL(image_url)
+    except httpx.InvalidURL:
+        raise DiagnosisError(400, "Invalid image URL.")
+
+    client = get_http_client("images")
+    try:
+        for _ in range(IMAGE_FETCH_MAX_REDIRECTS + 1):
+            _check_url(url)
+            async with client.stream("GET", url, follow_redirects=False) as response:
+                if response.is_redirect:
+                    url = url.join(response.headers["location"])
+                    continue
+                response.raise_for_status()
+                return await read_limited(response, IMAGE_MAX_UPLOAD_BYTES)
+    except httpx.ConnectError as e:
+        if isinstance(e.__cause__, BlockedAddressError):
+            raise DiagnosisError(400, "Image URL points to a private or reserved address.")
+        raise
+    raise DiagnosisError(400, "Image URL redirected too many times.")
+
+
+async def load_image(image_url: str) -> Tuple[bytes, str, str]:
+    """
+    Returns (data, content_type, image_hash) for an image URL. Images uploaded
+    through /disease/upload-image are usually still in memory. External images
+    are downloaded and preprocessed once; the URL is then mapped to their hash,
+    so later calls reuse the bytes and diagnoses while they stay cached.
+    """
+    image_hash = image_index.sha_for_url(image_url)
+    if image_hash:
+        cached = image_index.get_bytes(image_hash)
+        if cached is not None:
+            data, content_type = cached
+            return data, content_type, image_hash
+
+    backend = get_storage_backend()
+    key = backend.key_for_url(image_url)
+    if key is not None:
+        # Objects in our own store were preprocessed on upload; use them as they are
+        try:
+            data = await backend.download(key, IMAGE_MAX_UPLOAD_BYTES)
+        except FileNotFoundError:
+            raise DiagnosisError(404, "Image not found.")
+        except PayloadTooLargeError:
+            raise DiagnosisError(413, "Image is too large.")
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        if image_hash is None:
+            image_hash = hashlib.sha256(data).hexdigest()
+    else:
+        try:
+            image = await preprocess_image_async(await download_image(image_url))
+        except PayloadTooLargeError:
+            raise DiagnosisError(413, "Image is too large.")
+        data, content_type, image_hash = image.data, image.content_type, image.sha256
+        image_index.set_url(image_url, image_hash)
+
+    image_index.set_bytes(image_hash, data, content_type)
+    return data, content_type, image_hash
+
+
+async def store_image(data: Union[bytes, BinaryIO]) -> ImageEntry:
+    """
+    Preprocesses an uploaded image (bytes or a binary file) and stores it under
+    a content-addressed key, reusing the existing object for identical or
+    near-identical images.
+    Raises ValueError for undecodable images and httpx.HTTPStatusError if storage fails.
+    """
+    image = await preprocess_image_async(data)
+    entry = image_index.find(image.sha256, image.phash)
+    if entry is None:
+        # Content-addressed key: a repeat upload overwrites the same object rather than adding one
+        key = f"uploads/{image.sha256}.{image.extension}"
+        url = await get_storage_backend().upload_bytes(key, image.data, image.content_type)
+        entry = image_index.add(image.sha256, image.phash, url)
+    if entry.sha256 == image.sha256:
+        # Keep the bytes at hand so diagnosis doesn't download them again.
+        # A near-duplicate match points at a different stored object, whose
+        # hash must not be given this image's bytes.
+        image_index.set_bytes(entry.sha256, image.data, image.content_type)
+    return entry
+
+
+def parse_diagnosis(raw_result: str) -> DiseaseResponse:
+    try:
+        return parse_model(raw_result, DiseaseResponse)
+    except ValueError as e:
+        raise DiagnosisError(500, str(e))
+
+
+async def diagnose_image(image_url: str, language: str = "en") -> DiseaseResponse:
+    """
+    Diagnoses a plant image by sending its bytes inline with the disease prompt.
+    Repeat requests for the same image and language are served from the image index.
+    """
+    image_hash = image_index.sha_for_url(image_url)
+    if image_hash:
+        cached = image_index.get_diagnosis(image_hash, language)
+        if cached:
+            return DiseaseResponse(**cached)
+
+    data, content_type, image_hash = await load_image(image_url)
+    cached = image_index.get_diagnosis(image_hash, language)
+    if cached:
+        return DiseaseResponse(**cached)
+
+    # Confidently healthy leaves are answered locally without an LLM call
+    p_healthy = await healthy_probability(data)
+    if p_healthy is not None and p_healthy >= PLANT_CLASSIFIER_HEALTHY_THRESHOLD:
+        result = DiseaseResponse(status="healthy", disease=None, recommendation=None)
+        image_index.set_diagnosis(image_hash, language, result.dict())
+        return result
+
+    prompt = render_prompt(name="disease_prompt", language=language)
+
+    # Call the AI model and parse the result
+    raw_result = await call_gemini_with_image(
+        prompt, data, content_type, json_generation_config(DISEASE_RESPONSE_SCHEMA, GEMINI_VISION_MODEL)
+    )
+    print(f"Raw AI result: {raw_result}")
+    result = parse_diagnosis(raw_result)
+    image_index.set_diagnosis(image_hash, language, result.dict())
+    return result
+
+
+async def diagnose_batch(images: List[Union[str, bytes]], language: str = "en", concurrency: int = DISEASE_BATCH_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Diagnoses many images concurrently, at most `concurrency` at a time. Each
+    item is an image URL or the raw bytes of an upload. Yields one result per
+    image as soon as it is ready (not in input order), then a summary that
+    groups the images by diagnosis.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, image: Union[str, bytes]) -> dict:
+        async with semaphore:
+            image_url = image if isinstance(image, str) else None
+            try:
+                if image_url is None:
+                    image_url = (await store_image(image)).url
+                result = await diagnose_image(image_url, language)
+                return {"type": "result", "index": index, "image_url": image_url, "result": result.dict()}
+            except DiagnosisError as e:
+                error = e.detail
+            except Exception as e:
+                error = str(e)
+            return {"type": "error", "index": index, "image_url": image_url, "detail": error}
+
+    groups = {}
+    failed = []
+    tasks = [asyncio.create_task(run(index, image)) for index, image in enumerate(images)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            if item["type"] == "result":
+                result = item["result"]
+                label = result.get("disease") if result.get("status") != "healthy" else None
+                groups.setdefault(label or result.get("status") or "unknown", []).append(item["index"])
+            else:
+                failed.append(item["index"])
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "type": "summary",
+        "total": len(images),
+        "succeeded": len(images) - len(failed),
+        "failed": sorted(failed),
+        "by_disease": {label: sorted(indexes) for label, indexes in groups.items()},
+    }
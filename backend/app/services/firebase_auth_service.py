@@ -1,29 +1,51 @@
+import asyncio
+import functools
 import os
 import json
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
 from datetime import datetime, timedelta
 import jwt
-from passlib.context import CryptContext
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple
 from dotenv import load_dotenv
 from app.models.auth import UserResponse, ExtendedUserResponse, FarmDetails
+from app.services.cache import TTLCache
+from app.services.password_hashing import hash_password, verify_password
 
 load_dotenv()
 
-# Initialize password context for hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT Settings
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_TIME_HOURS = 24
 
+# Firebase user records backing token checks are kept this long. It bounds how
+# long a deleted, disabled or revoked account keeps access in other workers.
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000"))
+# Profiles (farm details, language) change rarely and every profile write goes
+# through update_user_profile, which invalidates the entry
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+# firebase_admin is blocking; its calls run on this many dedicated threads so a
+# burst of sign-ups cannot take over the default executor other endpoints use
+FIREBASE_MAX_WORKERS = int(os.getenv("FIREBASE_MAX_WORKERS", "8"))
+
+_firebase_executor = ThreadPoolExecutor(max_workers=FIREBASE_MAX_WORKERS, thread_name_prefix="firebase")
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a blocking firebase_admin call on the bounded Firebase executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_firebase_executor, functools.partial(func, *args, **kwargs))
+
 class FirebaseAuthService:
     def __init__(self):
         if not firebase_admin._apps:
             self._initialize_firebase()
         self.db = firestore.client()
+        self._user_cache = TTLCache(maxsize=AUTH_USER_CACHE_MAX_ENTRIES, ttl=AUTH_USER_CACHE_TTL)
+        self._profile_cache = TTLCache(maxsize=PROFILE_CACHE_MAX_ENTRIES, ttl=PROFILE_CACHE_TTL)
     
     def _initialize_firebase(self):
         """Initialize Firebase Admin SDK"""
@@ -50,7 +72,7 @@ class FirebaseAuthService:
             raise e
     
     def create_user(self, email: str, password: str, display_name: Optional[str] = None, 
-                   phone_number: Optional[str] = None) -> UserResponse:
+                   phone_number: Optional[str] = None, password_hash: Optional[str] = None) -> UserResponse:
         """Create a new user in Firebase Auth"""
         try:
             user_creation_args = {
@@ -66,6 +88,16 @@ class FirebaseAuthService:
             
             user_record = auth.create_user(**user_creation_args)
             
+            if password_hash:
+                # Kept server-side so /login can check the password
+                self._write_or_rollback(user_record.uid, {
+                    'uid': user_record.uid,
+                    'email': email,
+                    'password_hash': password_hash,
+                    'created_at': datetime.utcnow(),
+                    'updated_at': datetime.utcnow()
+                }, merge=True)
+            
             return UserResponse(
                 uid=user_record.uid,
                 email=user_record.email,
@@ -75,7 +107,7 @@ class FirebaseAuthService:
                 created_at=datetime.fromtimestamp(user_record.user_metadata.creation_timestamp / 1000)
             )
         except auth.EmailAlreadyExistsError:
-            raise ValueError("Email already exists")
+            raise ValueError("User with this email already exists")
         except Exception as e:
             raise ValueError(f"Error creating user: {str(e)}")
     
@@ -113,16 +145,64 @@ class FirebaseAuthService:
         except Exception as e:
             raise ValueError(f"Error fetching user: {str(e)}")
     
-    def verify_password(self, email: str, password: str) -> bool:
+    def _write_or_rollback(self, uid: str, data: Dict[str, Any], merge: bool = False):
+        """
+        Write the user document for a just-created Auth user. If the write fails
+        the Auth user is deleted, so no account exists without its password hash.
+        """
+        try:
+            self.db.collection('users').document(uid).set(data, merge=merge)
+        except Exception:
+            try:
+                auth.delete_user(uid)
+            except Exception as e:
+                print(f"Could not roll back user {uid} after a failed profile write: {e}")
+            raise
+    
+    def get_password_record(self, uid: str) -> Tuple[Optional[str], bool]:
         """
-        Verify user password. Note: Firebase Auth doesn't provide direct password verification
-        via Admin SDK, so this is a simplified implementation.
-        In production, you'd typically use Firebase Auth REST API or client SDK.
+        Get (password_hash, legacy_login) for an account. legacy_login is only
+        true for accounts explicitly marked as created before hashes were stored.
         """
-        # This is a simplified implementation - in real scenarios, you'd use Firebase Auth REST API
-        # For now, we'll just check if the user exists
-        user = self.get_user_by_email(email)
-        return user is not None
+        profile_doc = self.db.collection('users').document(uid).get()
+        if not profile_doc.exists:
+            return None, False
+        profile_data = profile_doc.to_dict()
+        return profile_data.get('password_hash'), profile_data.get('legacy_login') is True
+    
+    async def create_user_async(self, email: str, password: str, display_name: Optional[str] = None,
+                                phone_number: Optional[str] = None) -> UserResponse:
+        """Hash the password in the process pool, then create the user off the event loop"""
+        password_hash = await hash_password(password)
+        return await run_blocking(self.create_user, email, password, display_name, phone_number, password_hash)
+    
+    async def create_user_with_profile_async(self, name: str, email: str, password: str, mobile: str,
+                                             farm_details: Optional[FarmDetails] = None,
+                                             language: str = "en") -> ExtendedUserResponse:
+        """Hash the password in the process pool, then create the user and profile off the event loop"""
+        password_hash = await hash_password(password)
+        return await run_blocking(
+            self.create_user_with_profile, name, email, password, mobile, farm_details, language, password_hash
+        )
+    
+    async def authenticate(self, email: str, password: str) -> Optional[UserResponse]:
+        """
+        Return the user if the password matches the stored hash, else None.
+        Firebase Auth doesn't provide password verification via the Admin SDK.
+        Accounts created before hashes were stored only need to exist, but only
+        when their document is explicitly marked `legacy_login: true`; an
+        account without a hash is otherwise refused.
+        """
+        user = await run_blocking(self.get_user_by_email, email)
+        if not user:
+            return None
+        password_hash, legacy_login = await run_blocking(self.get_password_record, user.uid)
+        if password_hash:
+            return user if await verify_password(password, password_hash) else None
+        return user if legacy_login else None
+    
+    async def delete_user_async(self, uid: str) -> bool:
+        return await run_blocking(self.delete_user, uid)
     
     def create_custom_token(self, uid: str) -> str:
         """Create a custom JWT token for the user"""
@@ -137,20 +217,72 @@ class FirebaseAuthService:
         except Exception as e:
             raise ValueError(f"Error creating token: {str(e)}")
     
-    def verify_token(self, token: str) -> Optional[str]:
-        """Verify JWT token and return user UID"""
+    def decode_token(self, token: str) -> Dict[str, Any]:
+        """Verify the JWT signature and expiry and return its claims"""
         try:
-            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            return payload.get("uid")
+            return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         except jwt.ExpiredSignatureError:
             raise ValueError("Token has expired")
         except jwt.InvalidTokenError:
             raise ValueError("Invalid token")
     
+    def verify_token(self, token: str) -> Optional[str]:
+        """Verify JWT token and return user UID"""
+        return self.decode_token(token).get("uid")
+    
+    def get_auth_state(self, uid: str) -> Optional[Tuple[UserResponse, bool, int]]:
+        """
+        Get (user, disabled, tokens_valid_after_ms) from the Firebase Auth record,
+        or None if the account does not exist
+        """
+        try:
+            user_record = auth.get_user(uid)
+        except auth.UserNotFoundError:
+            return None
+        except Exception as e:
+            raise ValueError(f"Error fetching user: {str(e)}")
+        user = UserResponse(
+            uid=user_record.uid,
+            email=user_record.email,
+            display_name=user_record.display_name,
+            phone_number=user_record.phone_number,
+            email_verified=user_record.email_verified,
+            created_at=datetime.fromtimestamp(user_record.user_metadata.creation_timestamp / 1000)
+        )
+        return user, bool(user_record.disabled), user_record.tokens_valid_after_timestamp or 0
+    
+    async def authenticate_token(self, token: str) -> Optional[UserResponse]:
+        """
+        Verify a token against the current Firebase Auth record and return its
+        user, or None if the account no longer exists. Raises ValueError for
+        invalid or expired tokens, disabled accounts, and tokens issued before
+        the account's tokens were revoked (auth.revoke_refresh_tokens).
+        The record is shared by all workers and only cached for AUTH_USER_CACHE_TTL.
+        """
+        payload = self.decode_token(token)
+        uid = payload.get("uid")
+        if not uid:
+            raise ValueError("Invalid authentication token")
+        state = await self._user_cache.get_or_load(uid, lambda: run_blocking(self.get_auth_state, uid))
+        if state is None:
+            return None
+        user, disabled, tokens_valid_after = state
+        if disabled:
+            raise ValueError("User account is disabled")
+        if payload.get("iat", 0) * 1000 < tokens_valid_after:
+            raise ValueError("Token has been revoked")
+        return user
+    
+    def invalidate_user(self, uid: str):
+        """Drop cached data for a user after it changed"""
+        self._user_cache.invalidate(uid)
+        self._profile_cache.invalidate(uid)
+    
     def delete_user(self, uid: str) -> bool:
         """Delete user from Firebase Auth"""
         try:
             auth.delete_user(uid)
+            self.invalidate_user(uid)
             return True
         except auth.UserNotFoundError:
             return False
@@ -159,7 +291,7 @@ class FirebaseAuthService:
     
     def create_user_with_profile(self, name: str, email: str, password: str, mobile: str, 
                                farm_details: Optional[FarmDetails] = None, 
-                               language: str = "en") -> ExtendedUserResponse:
+                               language: str = "en", password_hash: Optional[str] = None) -> ExtendedUserResponse:
         """Create a new user with extended profile information"""
         try:
             # First, create user in Firebase Auth
@@ -184,6 +316,8 @@ class FirebaseAuthService:
                 'updated_at': datetime.utcnow(),
                 'email_verified': False
             }
+            if password_hash:
+                profile_data['password_hash'] = password_hash
             
             # Add farm details if provided
             if farm_details:
@@ -192,7 +326,7 @@ class FirebaseAuthService:
                     profile_data['farmDetails'] = farm_dict
             
             # Store user profile in Firestore
-            self.db.collection('users').document(user_record.uid).set(profile_data)
+            self._write_or_rollback(user_record.uid, profile_data)
             
             return ExtendedUserResponse(
                 uid=user_record.uid,
@@ -207,10 +341,42 @@ class FirebaseAuthService:
             )
             
         except auth.EmailAlreadyExistsError:
-            raise ValueError("Email already exists")
+            raise ValueError("User with this email already exists")
         except Exception as e:
             raise ValueError(f"Error creating user with profile: {str(e)}")
     
+    def _build_profile(self, user_record, profile_doc) -> ExtendedUserResponse:
+        """Combine the Firebase Auth record with the Firestore profile document"""
+        if profile_doc.exists:
+            profile_data = profile_doc.to_dict()
+            farm_details = None
+            
+            # Convert farm details back to FarmDetails model if exists
+            if 'farmDetails' in profile_data:
+                farm_details = FarmDetails(**profile_data['farmDetails'])
+            
+            return ExtendedUserResponse(
+                uid=user_record.uid,
+                email=user_record.email,
+                display_name=user_record.display_name,
+                phone_number=user_record.phone_number,
+                email_verified=user_record.email_verified,
+                created_at=datetime.fromtimestamp(user_record.user_metadata.creation_timestamp / 1000),
+                mobile=profile_data.get('mobile'),
+                farmDetails=farm_details,
+                language=profile_data.get('language', 'en')
+            )
+        else:
+            # Return basic user info if no profile exists
+            return ExtendedUserResponse(
+                uid=user_record.uid,
+                email=user_record.email,
+                display_name=user_record.display_name,
+                phone_number=user_record.phone_number,
+                email_verified=user_record.email_verified,
+                created_at=datetime.fromtimestamp(user_record.user_metadata.creation_timestamp / 1000)
+            )
+    
     def get_user_profile(self, uid: str) -> Optional[ExtendedUserResponse]:
         """Get extended user profile with farm details"""
         try:
@@ -220,41 +386,30 @@ class FirebaseAuthService:
             # Get additional profile data from Firestore
             profile_doc = self.db.collection('users').document(uid).get()
             
-            if profile_doc.exists:
-                profile_data = profile_doc.to_dict()
-                farm_details = None
-                
-                # Convert farm details back to FarmDetails model if exists
-                if 'farmDetails' in profile_data:
-                    farm_details = FarmDetails(**profile_data['farmDetails'])
-                
-                return ExtendedUserResponse(
-                    uid=user_record.uid,
-                    email=user_record.email,
-                    display_name=user_record.display_name,
-                    phone_number=user_record.phone_number,
-                    email_verified=user_record.email_verified,
-                    created_at=datetime.fromtimestamp(user_record.user_metadata.creation_timestamp / 1000),
-                    mobile=profile_data.get('mobile'),
-                    farmDetails=farm_details,
-                    language=profile_data.get('language', 'en')
-                )
-            else:
-                # Return basic user info if no profile exists
-                return ExtendedUserResponse(
-                    uid=user_record.uid,
-                    email=user_record.email,
-                    display_name=user_record.display_name,
-                    phone_number=user_record.phone_number,
-                    email_verified=user_record.email_verified,
-                    created_at=datetime.fromtimestamp(user_record.user_metadata.creation_timestamp / 1000)
-                )
+            return self._build_profile(user_record, profile_doc)
                 
         except auth.UserNotFoundError:
             return None
         except Exception as e:
             raise ValueError(f"Error fetching user profile: {str(e)}")
     
+    async def _load_user_profile(self, uid: str) -> Optional[ExtendedUserResponse]:
+        try:
+            # The Auth record and the Firestore document are independent, so fetch both at once
+            user_record, profile_doc = await asyncio.gather(
+                run_blocking(auth.get_user, uid),
+                run_blocking(self.db.collection('users').document(uid).get)
+            )
+            return self._build_profile(user_record, profile_doc)
+        except auth.UserNotFoundError:
+            return None
+        except Exception as e:
+            raise ValueError(f"Error fetching user profile: {str(e)}")
+    
+    async def get_user_profile_async(self, uid: str) -> Optional[ExtendedUserResponse]:
+        """Get extended user profile without blocking the event loop, through the profile cache"""
+        return await self._profile_cache.get_or_load(uid, lambda: self._load_user_profile(uid))
+    
     def update_user_profile(self, uid: str, farm_details: Optional[FarmDetails] = None, 
                           language: Optional[str] = None) -> bool:
         """Update user profile information"""
@@ -273,6 +428,7 @@ class FirebaseAuthService:
             
             # Update in Firestore
             self.db.collection('users').document(uid).update(update_data)
+            self.invalidate_user(uid)
             return True
             
         except Exception as e:
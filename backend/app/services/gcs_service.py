@@ -1,25 +1,79 @@
-from google.cloud import storage
 from dotenv import load_dotenv
-import mimetypes
-import uuid
+from typing import Optional
+from urllib.parse import quote, unquote
+import asyncio
 import os
+from app.services.http_clients import get_http_client, read_limited
 
 load_dotenv()
 GOOGLE_CLOUD_PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
 
-def upload_image_to_gcs(file, bucket_name: str, folder: str = "uploads") -> str:
+GCS_UPLOAD_URL = "https://storage.googleapis.com/upload/storage/v1/b/{bucket}/o"
+GCS_SCOPES = ["https://www.googleapis.com/auth/devstorage.read_write"]
+
+class GCSStorageBackend:
     """
-    Uploads an image to Google Cloud Storage and returns the public URL.
+    Stores objects through the GCS JSON API on the shared async HTTP client.
+    Images are preprocessed (and so small) before they are uploaded, which a
+    single media request handles without occupying a worker thread.
     """
-    client = storage.Client(project=GOOGLE_CLOUD_PROJECT_ID)
-    bucket = client.bucket(bucket_name)
 
-    filename_ext = file.filename.split('.')[-1]
-    filename = f"{folder}/{uuid.uuid4().hex}.{filename_ext}"
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self._credentials = None
+        self._token_lock = asyncio.Lock()
+
+    def public_url(self, key: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{quote(key)}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Returns the object key if `url` points into this bucket."""
+        prefix = f"https://storage.googleapis.com/{self.bucket_name}/"
+        if url.startswith(prefix):
+            return unquote(url[len(prefix):].split("?", 1)[0])
+        return None
+
+    async def download(self, key: str, max_bytes: Optional[int] = None) -> bytes:
+        """
+        Downloads an object. Raises FileNotFoundError if it does not exist and
+        PayloadTooLargeError if it is larger than `max_bytes`.
+        """
+        async with get_http_client("gcs").stream(
+            "GET",
+            f"https://storage.googleapis.com/storage/v1/b/{self.bucket_name}/o/{quote(key, safe='')}",
+            params={"alt": "media"},
+            headers=await self._auth_header(),
+        ) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            return await read_limited(response, max_bytes)
+
+    async def _auth_header(self) -> dict:
+        async with self._token_lock:
+            if self._credentials is None or not self._credentials.valid:
+                # Token refreshes are rare (hourly) and blocking, so they run off the event loop
+                self._credentials = await asyncio.to_thread(self._load_credentials)
+        return {"Authorization": f"Bearer {self._credentials.token}"}
 
-    blob = bucket.blob(filename)
-    content_type = file.content_type or mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
+    def _load_credentials(self):
+        import google.auth
+        from google.auth.transport.requests import Request
+        credentials = self._credentials
+        if credentials is None:
+            credentials, _ = google.auth.default(scopes=GCS_SCOPES)
+        credentials.refresh(Request())
+        return credentials
 
-    blob.upload_from_file(file.file, content_type=content_type)
+    async def upload_bytes(self, key: str, data: bytes, content_type: str) -> str:
+        await self._upload_simple(key, data, content_type)
+        return self.public_url(key)
 
-    return blob.public_url
\ No newline at end of file
+    async def _upload_simple(self, key: str, data: bytes, content_type: str):
+        response = await get_http_client("gcs").post(
+            GCS_UPLOAD_URL.format(bucket=self.bucket_name),
+            params={"uploadType": "media", "name": key},
+            headers={**await self._auth_header(), "Content-Type": content_type},
+            content=data,
+        )
+        response.raise_for_status()
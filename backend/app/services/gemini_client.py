@@ -1,26 +1,166 @@
+import asyncio
+import hashlib
+import json
 import os
+import re
+from typing import AsyncIterator, Optional
 import google.generativeai as genai
 from dotenv import load_dotenv
+from app.services.completion_cache import completion_cache, completion_key
 load_dotenv(override=True)
 
 GEMINI_KEY = os.getenv("GEMINI_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro") # Default to gemini-pro
+# Model used when images are sent inline; it must accept image parts
+GEMINI_VISION_MODEL = os.getenv("GEMINI_VISION_MODEL", "gemini-1.5-flash")
+# Upper bound on Gemini calls in flight from this process
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# Ask for schema-constrained JSON on structured calls. "auto" uses it only for
+# models with JSON mode (gemini-1.5 and later); "true" forces it and "false"
+# turns it off. Without it, output is parsed tolerantly.
+GEMINI_JSON_MODE = os.getenv("GEMINI_JSON_MODE", "auto").lower()
+
+GEMINI_ERROR_MESSAGE = "Error: Could not get a response from the AI model."
 
 genai.configure(api_key=GEMINI_KEY)
 
+_models = {}
+_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+def get_model(name: str = GEMINI_MODEL) -> genai.GenerativeModel:
+    """Returns the process-wide instance of a model, creating it on first use."""
+    model = _models.get(name)
+    if model is None:
+        model = _models[name] = genai.GenerativeModel(name)
+    return model
+
+def _response_text(response) -> str:
+    try:
+        return response.text
+    except Exception:
+        # .text raises when the candidate was blocked or has no text parts;
+        # failing here keeps such responses out of the completion cache
+        raise ValueError(f"Gemini returned no text: {getattr(response, 'prompt_feedback', None)}")
+
+# Finish reasons of a completed answer; anything else (SAFETY, RECITATION, ...)
+# means the stream was cut off and must not be cached
+_COMPLETE_FINISH_REASONS = {"STOP", "MAX_TOKENS", "FINISH_REASON_UNSPECIFIED"}
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed chunk; empty for chunks that carry no text, such as a finish-only final chunk."""
+    try:
+        return chunk.text
+    except Exception:
+        return ""
+
+def _finish_reason(chunk) -> Optional[str]:
+    candidates = getattr(chunk, "candidates", None)
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return getattr(reason, "name", None) if reason is not None else None
+
+_MODEL_VERSION = re.compile(r"^gemini-(\d+(?:\.\d+)?)")
+
+def supports_json_mode(model_name: str) -> bool:
+    """True for models that accept response_mime_type and response_schema (gemini-1.5 and later)."""
+    match = _MODEL_VERSION.match(model_name.removeprefix("models/"))
+    return match is not None and float(match.group(1)) >= 1.5
+
+def json_generation_config(schema: dict, model_name: str = GEMINI_MODEL) -> Optional[dict]:
+    """
+    Generation config requesting JSON output that matches `schema` from
+    `model_name`, or None when JSON mode is disabled or unsupported by the model.
+    """
+    if GEMINI_JSON_MODE == "false" or (GEMINI_JSON_MODE != "true" and not supports_json_mode(model_name)):
+        return None
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+def _cache_parts(generation_config: Optional[dict]) -> tuple:
+    return (json.dumps(generation_config, sort_keys=True),) if generation_config else ()
+
 def call_gemini(prompt: str) -> str:
-    """Calls the Gemini API with the given prompt."""
+    """Calls the Gemini API with the given prompt. Blocking; prefer call_gemini_async in async code."""
     try:
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        response = model.generate_content(prompt)
-        return response.text if hasattr(response, 'text') else str(response)
+        response = get_model().generate_content(prompt)
+        return _response_text(response)
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
-        return "Error: Could not get a response from the AI model."
-    
+        return GEMINI_ERROR_MESSAGE
+
+async def _generate(contents, model_name: str = GEMINI_MODEL, generation_config: Optional[dict] = None) -> str:
+    async with _semaphore:
+        response = await get_model(model_name).generate_content_async(
+            contents, generation_config=generation_config
+        )
+        return _response_text(response)
+
+async def call_gemini_async(prompt: str, generation_config: Optional[dict] = None) -> str:
+    """Calls the Gemini API without blocking the event loop. Completions are served from the completion cache when possible."""
+    try:
+        return await completion_cache.get_or_generate(
+            completion_key(GEMINI_MODEL, prompt, *_cache_parts(generation_config)),
+            lambda: _generate(prompt, GEMINI_MODEL, generation_config)
+        )
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        return GEMINI_ERROR_MESSAGE
+
+async def call_gemini_with_image(prompt: str, image_data: bytes, mime_type: str, generation_config: Optional[dict] = None) -> str:
+    """
+    Sends the prompt together with the image bytes inline to the vision model,
+    so the model sees pixels instead of having to resolve a URL.
+    """
+    image_hash = hashlib.sha256(image_data).hexdigest()
+    contents = [prompt, {"mime_type": mime_type, "data": image_data}]
+    try:
+        return await completion_cache.get_or_generate(
+            completion_key(GEMINI_VISION_MODEL, prompt, image_hash, *_cache_parts(generation_config)),
+            lambda: _generate(contents, GEMINI_VISION_MODEL, generation_config)
+        )
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        return GEMINI_ERROR_MESSAGE
+
+async def stream_gemini(prompt: str) -> AsyncIterator[str]:
+    """
+    Streams the completion as text chunks as soon as Gemini produces them.
+    The concurrency slot is held until the stream is exhausted or closed.
+    A cached completion is yielded as a single chunk; a fully streamed one is
+    stored in the cache.
+    """
+    key = completion_key(GEMINI_MODEL, prompt)
+    if completion_cache.enabled:
+        cached = await completion_cache.get(key)
+        if cached is not None:
+            completion_cache.hits += 1
+            yield cached
+            return
+        completion_cache.misses += 1
+
+    async with _semaphore:
+        chunks = []
+        finish_reason = None
+        try:
+            response = await get_model().generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                finish_reason = _finish_reason(chunk) or finish_reason
+                text = _chunk_text(chunk)
+                if text:
+                    chunks.append(text)
+                    yield text
+            if not chunks:
+                raise ValueError(f"Gemini returned no text: {getattr(response, 'prompt_feedback', None)}")
+        except Exception as e:
+            print(f"Error streaming from Gemini API: {e}")
+            if not chunks:
+                yield GEMINI_ERROR_MESSAGE
+            return
+
+    if completion_cache.enabled and (finish_reason is None or finish_reason in _COMPLETE_FINISH_REASONS):
+        await completion_cache.set(key, "".join(chunks))
+
 
 if __name__ == "__main__":
     # Example usage
     example_prompt = "What is the weather like today in benguluru?"
     response = call_gemini(example_prompt)
-    print(f"Response from Gemini: {response}")
\ No newline at end of file
+    print(f"Response from Gemini: {response}")
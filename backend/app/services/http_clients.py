@@ -0,0 +1,169 @@
+import asyncio
+import ipaddress
+import os
+import random
+import socket
+import httpcore
+import httpx
+from typing import Optional
+from app.core.config import (
+    HTTP_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_RETRIES,
+    HTTP_RETRY_BACKOFF,
+)
+
+# Upstream providers we keep a pooled client for. HTTP/2 is negotiated via ALPN,
+# so providers that only speak HTTP/1.1 transparently fall back to it.
+PROVIDERS = {
+    "openweather": {"http2": True},
+    "datagov": {"http2": True},
+    "gcs": {"http2": True},
+    # Arbitrary image URLs submitted for diagnosis; may only reach public addresses
+    "images": {"http2": True, "public_only": True},
+}
+
+# Status codes that are safe to retry for idempotent requests
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_clients: dict = {}
+
+
+class PayloadTooLargeError(Exception):
+    """Raised when a body is larger than the caller allows."""
+
+
+async def read_limited(response: httpx.Response, max_bytes: Optional[int] = None) -> bytes:
+    """Reads a streamed response body, failing with PayloadTooLargeError past `max_bytes`."""
+    length = response.headers.get("content-length", "")
+    if max_bytes is not None and length.isdigit() and int(length) > max_bytes:
+        raise PayloadTooLargeError(f"Body of {length} bytes exceeds {max_bytes}")
+    data = bytearray()
+    async for chunk in response.aiter_bytes():
+        data.extend(chunk)
+        if max_bytes is not None and len(data) > max_bytes:
+            raise PayloadTooLargeError(f"Body exceeds {max_bytes} bytes")
+    return bytes(data)
+
+
+class BlockedAddressError(httpcore.ConnectError):
+    """Raised when a public-only client is asked to connect to a non-public address."""
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address)
+    if getattr(ip, "ipv4_mapped", None):
+        ip = ip.ipv4_mapped
+    # Rejects loopback, private, link-local (cloud metadata), reserved and multicast ranges
+    return ip.is_global and not ip.is_multicast
+
+
+class PublicAddressBackend(httpcore.AnyIOBackend):
+    """
+    Resolves the host itself and dials the vetted address, so the address that
+    was checked is the one connected to (DNS rebinding cannot swap it between
+    the check and the connect). TLS still uses the hostname for SNI and
+    certificate verification.
+    """
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(f"Could not resolve host '{host}': {e}")
+        addresses = [sockaddr[0] for *_, sockaddr in infos]
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise BlockedAddressError(f"Host '{host}' resolves to a private or reserved address")
+        return await super().connect_tcp(addresses[0], port, timeout, local_address, socket_options)
+
+
+class PublicOnlyTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that only connects to public addresses, and never through a proxy."""
+
+    def __init__(self, http2: bool, limits: httpx.Limits):
+        super().__init__(http2=http2, limits=limits)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http2=http2,
+            network_backend=PublicAddressBackend(),
+        )
+
+
+def _provider_setting(provider: str, name: str, default):
+    """Reads a per-provider override such as OPENWEATHER_HTTP_MAX_CONNECTIONS."""
+    value = os.getenv(f"{provider.upper()}_{name}")
+    return type(default)(value) if value is not None else default
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=_provider_setting(provider, "HTTP_MAX_CONNECTIONS", HTTP_MAX_CONNECTIONS),
+        max_keepalive_connections=_provider_setting(provider, "HTTP_MAX_KEEPALIVE_CONNECTIONS", HTTP_MAX_KEEPALIVE_CONNECTIONS),
+        keepalive_expiry=_provider_setting(provider, "HTTP_KEEPALIVE_EXPIRY", HTTP_KEEPALIVE_EXPIRY),
+    )
+    http2 = PROVIDERS.get(provider, {}).get("http2", False)
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        http2 = False
+    public_only = PROVIDERS.get(provider, {}).get("public_only", False)
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=_provider_setting(provider, "HTTP_TIMEOUT", HTTP_TIMEOUT),
+        transport=PublicOnlyTransport(http2, limits) if public_only else None,
+        # Environment proxies would connect on our behalf and skip the address check
+        trust_env=not public_only,
+    )
+
+
+async def init_http_clients():
+    """Creates one pooled client per provider. Called on app startup."""
+    for provider in PROVIDERS:
+        if provider not in _clients:
+            _clients[provider] = _build_client(provider)
+
+
+async def close_http_clients():
+    """Closes every pooled client. Called on app shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients))
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """Returns the shared client for a provider, creating it lazily outside the app lifespan."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _clients[provider] = _build_client(provider)
+    return client
+
+
+async def request_with_retry(provider: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Sends a request through the provider's shared client. Idempotent requests are
+    retried with exponential backoff on transport errors and retryable status codes.
+    The final response is returned as-is; callers decide whether to raise_for_status().
+    """
+    client = get_http_client(provider)
+    method = method.upper()
+    retries = HTTP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+    for attempt in range(retries + 1):
+        try:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == retries:
+                return response
+            print(f"{provider} returned {response.status_code}, retrying ({attempt + 1}/{retries})")
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            print(f"{provider} transport error: {str(e)}, retrying ({attempt + 1}/{retries})")
+        # Full jitter keeps a burst of failing requests from retrying in lockstep
+        await asyncio.sleep(random.uniform(0, HTTP_RETRY_BACKOFF * (2 ** attempt)))
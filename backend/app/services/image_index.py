@@ -0,0 +1,113 @@
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from app.services.cache import TTLCache
+
+# Maximum differing dHash bits for two uploads to count as the same photo
+IMAGE_PHASH_THRESHOLD = int(os.getenv("IMAGE_PHASH_THRESHOLD", "4"))
+IMAGE_INDEX_MAX_ENTRIES = int(os.getenv("IMAGE_INDEX_MAX_ENTRIES", "5000"))
+DIAGNOSIS_CACHE_TTL = float(os.getenv("DIAGNOSIS_CACHE_TTL", str(7 * 24 * 60 * 60)))
+# Preprocessed image bytes kept in memory so diagnosis never re-downloads a fresh upload
+IMAGE_BYTES_CACHE_MAX_BYTES = int(os.getenv("IMAGE_BYTES_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# Uploaded objects are named after the SHA-256 of their bytes
+_CONTENT_KEY = re.compile(r"/([0-9a-f]{64})\.[a-z0-9]+$")
+
+
+@dataclass
+class ImageEntry:
+    sha256: str
+    phash: int
+    url: str
+
+
+class ImageIndex:
+    """
+    Maps uploaded image content to its stored object and to the last diagnosis
+    per language, so a repeated upload (the app retries on flaky networks) is
+    neither stored nor diagnosed twice.
+    """
+
+    def __init__(self, maxsize: int, phash_threshold: int, diagnosis_ttl: float, max_bytes: int):
+        self.maxsize = maxsize
+        self.phash_threshold = phash_threshold
+        self.max_bytes = max_bytes
+        self._by_sha: "OrderedDict[str, ImageEntry]" = OrderedDict()
+        self._sha_by_url: "OrderedDict[str, str]" = OrderedDict()
+        self._diagnoses = TTLCache(maxsize=maxsize, ttl=diagnosis_ttl)
+        self._bytes: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._bytes_total = 0
+
+    def find(self, sha256: str, phash: int) -> Optional[ImageEntry]:
+        """Returns the stored entry for identical content, or else the closest near-duplicate."""
+        entry = self._by_sha.get(sha256)
+        if entry is None:
+            best_distance = self.phash_threshold + 1
+            for candidate in self._by_sha.values():
+                distance = (candidate.phash ^ phash).bit_count()
+                if distance < best_distance:
+                    entry, best_distance = candidate, distance
+        if entry is not None:
+            self._by_sha.move_to_end(entry.sha256)
+        return entry
+
+    def add(self, sha256: str, phash: int, url: str) -> ImageEntry:
+        entry = self._by_sha[sha256] = ImageEntry(sha256, phash, url)
+        self._by_sha.move_to_end(sha256)
+        self.set_url(url, sha256)
+        while len(self._by_sha) > self.maxsize:
+            _, evicted = self._by_sha.popitem(last=False)
+            self._sha_by_url.pop(evicted.url, None)
+        return entry
+
+    def set_url(self, url: str, sha256: str):
+        """Remembers which image a URL resolved to, so it is not fetched again."""
+        self._sha_by_url[url] = sha256
+        self._sha_by_url.move_to_end(url)
+        while len(self._sha_by_url) > self.maxsize:
+            self._sha_by_url.popitem(last=False)
+
+    def sha_for_url(self, url: str) -> Optional[str]:
+        sha256 = self._sha_by_url.get(url)
+        if sha256 is not None:
+            self._sha_by_url.move_to_end(url)
+        else:
+            # Content-addressed URLs identify the image even across restarts
+            match = _CONTENT_KEY.search(url.split("?", 1)[0])
+            sha256 = match.group(1) if match else None
+        return sha256
+
+    def get_bytes(self, sha256: str) -> Optional[Tuple[bytes, str]]:
+        """Returns (data, content_type) for an image still held in memory."""
+        cached = self._bytes.get(sha256)
+        if cached is not None:
+            self._bytes.move_to_end(sha256)
+        return cached
+
+    def set_bytes(self, sha256: str, data: bytes, content_type: str):
+        if len(data) > self.max_bytes:
+            return
+        previous = self._bytes.pop(sha256, None)
+        if previous is not None:
+            self._bytes_total -= len(previous[0])
+        self._bytes[sha256] = (data, content_type)
+        self._bytes_total += len(data)
+        while self._bytes_total > self.max_bytes:
+            _, (evicted, _) = self._bytes.popitem(last=False)
+            self._bytes_total -= len(evicted)
+
+    def get_diagnosis(self, sha256: str, language: str) -> Optional[dict]:
+        return self._diagnoses.get((sha256, language))
+
+    def set_diagnosis(self, sha256: str, language: str, diagnosis: dict):
+        self._diagnoses.set((sha256, language), diagnosis)
+
+
+image_index = ImageIndex(
+    maxsize=IMAGE_INDEX_MAX_ENTRIES,
+    phash_threshold=IMAGE_PHASH_THRESHOLD,
+    diagnosis_ttl=DIAGNOSIS_CACHE_TTL,
+    max_bytes=IMAGE_BYTES_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Union
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+try:
+    # Registers the AVIF codec on Pillow builds without native AVIF support
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# The diagnosis model gains nothing from more pixels than this on the long side
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "WEBP").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "4"))
+
+OUTPUT_TYPES = {
+    "WEBP": ("image/webp", "webp"),
+    "JPEG": ("image/jpeg", "jpg"),
+    "PNG": ("image/png", "png"),
+}
+
+# Dedicated pool so a burst of uploads can't starve the default threadpool;
+# Pillow releases the GIL while decoding, resizing and encoding.
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+
+@dataclass
+class ProcessedImage:
+    data: bytes
+    content_type: str
+    extension: str
+    width: int
+    height: int
+    sha256: str
+    phash: int
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit difference hash (dHash): compares neighbouring pixels of a 9x8
+    grayscale thumbnail. Re-encoded or slightly resized copies of a photo land
+    within a few bits of each other.
+    """
+    pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def preprocess_image(data: Union[bytes, BinaryIO]) -> ProcessedImage:
+    """
+    Decodes any image format Pillow can read, applies the EXIF orientation,
+    downsamples to IMAGE_MAX_DIMENSION and re-encodes to IMAGE_OUTPUT_FORMAT.
+    Metadata (EXIF, GPS, ICC) is not carried over. `data` is the encoded image
+    or a binary file positioned at its start. Raises ValueError if it is not a
+    supported image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data) if isinstance(data, bytes) else data)
+        # JPEG can decode straight at a reduced scale, which is much faster than a full decode
+        image.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError("Unsupported or corrupt image.") from e
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        # Flatten transparency onto white; leaf photos don't need an alpha channel
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel("A"))
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+
+    content_type, extension = OUTPUT_TYPES[IMAGE_OUTPUT_FORMAT]
+    output = io.BytesIO()
+    image.save(output, format=IMAGE_OUTPUT_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    encoded = output.getvalue()
+    return ProcessedImage(
+        data=encoded,
+        content_type=content_type,
+        extension=extension,
+        width=image.width,
+        height=image.height,
+        sha256=hashlib.sha256(encoded).hexdigest(),
+        phash=perceptual_hash(image),
+    )
+
+
+async def preprocess_image_async(data: Union[bytes, BinaryIO]) -> ProcessedImage:
+    return await asyncio.get_running_loop().run_in_executor(_executor, preprocess_image, data)
@@ -0,0 +1,69 @@
+import os
+from typing import List
+from dotenv import load_dotenv
+from app.services.cache import TTLCache
+from app.services.http_clients import request_with_retry
+from app.services.market_store import get_latest_prices, store_has_data
+
+load_dotenv()
+
+DATA_GOV_IN_API_KEY = os.getenv("DATA_GOV_IN_API_KEY")
+MANDI_PRICES_URL = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+
+# Mandi prices are published about once a day, so a district result stays useful
+# for hours. Past the TTL the cached copy is still served for MARKET_CACHE_STALE_TTL
+# while a background refresh fetches the new one.
+MARKET_CACHE_TTL = float(os.getenv("MARKET_CACHE_TTL", str(6 * 60 * 60)))
+MARKET_CACHE_STALE_TTL = float(os.getenv("MARKET_CACHE_STALE_TTL", str(24 * 60 * 60)))
+MARKET_CACHE_MAX_ENTRIES = int(os.getenv("MARKET_CACHE_MAX_ENTRIES", "2000"))
+# Records fetched per (state, district, commodity); covers every market in the district
+MARKET_FETCH_LIMIT = int(os.getenv("MARKET_FETCH_LIMIT", "500"))
+
+_district_cache = TTLCache(
+    maxsize=MARKET_CACHE_MAX_ENTRIES,
+    ttl=MARKET_CACHE_TTL,
+    stale_ttl=MARKET_CACHE_STALE_TTL,
+)
+
+
+def _normalize(value: str) -> str:
+    return value.strip().lower()
+
+
+async def _fetch_district_prices(state: str, district: str, commodity: str) -> List[dict]:
+    params = {
+        "api-key": DATA_GOV_IN_API_KEY,
+        "format": "json",
+        "limit": MARKET_FETCH_LIMIT,
+        "filters[state]": state,
+        "filters[district]": district,
+        "filters[commodity]": commodity,
+    }
+    response = await request_with_retry("datagov", "GET", MANDI_PRICES_URL, params=params)
+    response.raise_for_status()
+    return response.json().get("records", [])
+
+
+async def fetch_district_prices(state: str, district: str, commodity: str) -> List[dict]:
+    """
+    Returns every mandi price record for a commodity in a district, served from
+    the shared cache. Raises httpx.HTTPStatusError if the provider rejects the request.
+    """
+    key = (_normalize(state), _normalize(district), _normalize(commodity))
+    return await _district_cache.get_or_load(
+        key, lambda: _fetch_district_prices(state, district, commodity)
+    )
+
+
+async def get_market_records(state: str, district: str, market: str, commodity: str) -> List[dict]:
+    """
+    Returns the latest price records for a single market. Served from the local
+    mandi store once it has been ingested; until then the cached district result
+    from data.gov.in is filtered locally.
+    """
+    if await store_has_data():
+        return await get_latest_prices(state, district, market, commodity)
+
+    records = await fetch_district_prices(state, district, commodity)
+    market = _normalize(market)
+    return [record for record in records if _normalize(record.get("market", "")) == market]
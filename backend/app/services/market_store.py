@@ -0,0 +1,259 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from app.services.http_clients import request_with_retry
+
+load_dotenv()
+
+DATA_GOV_IN_API_KEY = os.getenv("DATA_GOV_IN_API_KEY")
+MANDI_PRICES_URL = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+
+MARKET_DB_PATH = os.getenv("MARKET_DB_PATH", "data/market_prices.db")
+MARKET_INGEST_PAGE_SIZE = int(os.getenv("MARKET_INGEST_PAGE_SIZE", "1000"))
+# Records for the same market/commodity/date from a later run overwrite earlier ones,
+# and older dates are kept, so the table accumulates price history over time.
+MARKET_INGEST_INTERVAL = float(os.getenv("MARKET_INGEST_INTERVAL", str(6 * 60 * 60)))
+MARKET_INGEST_ENABLED = os.getenv("MARKET_INGEST_ENABLED", "true").lower() == "true" and bool(DATA_GOV_IN_API_KEY)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mandi_prices (
+    state TEXT NOT NULL COLLATE NOCASE,
+    district TEXT NOT NULL COLLATE NOCASE,
+    market TEXT NOT NULL COLLATE NOCASE,
+    commodity TEXT NOT NULL COLLATE NOCASE,
+    variety TEXT NOT NULL DEFAULT '',
+    grade TEXT NOT NULL DEFAULT '',
+    arrival_date TEXT NOT NULL,
+    min_price REAL,
+    max_price REAL,
+    modal_price REAL,
+    PRIMARY KEY (state, district, market, commodity, variety, grade, arrival_date)
+);
+CREATE INDEX IF NOT EXISTS idx_mandi_prices_lookup
+    ON mandi_prices (state, district, commodity, market, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_mandi_prices_district ON mandi_prices (district);
+CREATE INDEX IF NOT EXISTS idx_mandi_prices_market ON mandi_prices (market);
+CREATE INDEX IF NOT EXISTS idx_mandi_prices_commodity ON mandi_prices (commodity, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_mandi_prices_arrival_date ON mandi_prices (arrival_date);
+CREATE TABLE IF NOT EXISTS ingestion_runs (
+    finished_at TEXT NOT NULL,
+    records INTEGER NOT NULL
+);
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+_store_ready = False
+
+
+def _connect() -> sqlite3.Connection:
+    """Returns this thread's connection, creating the database and schema on first use."""
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(MARKET_DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(MARKET_DB_PATH)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers keep serving while an ingestion run is writing
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with _schema_lock:
+            if not _schema_ready:
+                conn.executescript(SCHEMA)
+                _schema_ready = True
+        _local.conn = conn
+    return conn
+
+
+def _parse_price(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_date(value: str) -> Optional[str]:
+    """data.gov.in uses dd/mm/yyyy; store ISO dates so they sort and range-filter correctly."""
+    try:
+        return datetime.strptime(value, "%d/%m/%Y").date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_price(value: Optional[float]) -> str:
+    if value is None:
+        return ""
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _to_row(record: dict) -> Optional[tuple]:
+    arrival_date = _parse_date(record.get("arrival_date"))
+    if not arrival_date:
+        return None
+    return (
+        record.get("state", ""),
+        record.get("district", ""),
+        record.get("market", ""),
+        record.get("commodity", ""),
+        record.get("variety") or "",
+        record.get("grade") or "",
+        arrival_date,
+        _parse_price(record.get("min_price")),
+        _parse_price(record.get("max_price")),
+        _parse_price(record.get("modal_price")),
+    )
+
+
+def _to_record(row: sqlite3.Row) -> dict:
+    """Converts a stored row back to the shape of a data.gov.in record."""
+    return {
+        "state": row["state"],
+        "district": row["district"],
+        "market": row["market"],
+        "commodity": row["commodity"],
+        "variety": row["variety"],
+        "grade": row["grade"],
+        "arrival_date": datetime.strptime(row["arrival_date"], "%Y-%m-%d").strftime("%d/%m/%Y"),
+        "min_price": _format_price(row["min_price"]),
+        "max_price": _format_price(row["max_price"]),
+        "modal_price": _format_price(row["modal_price"]),
+    }
+
+
+def _write_records(records: List[dict]) -> int:
+    rows = [row for row in map(_to_row, records) if row is not None]
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO mandi_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+    return len(rows)
+
+
+def _record_run(records: int):
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT INTO ingestion_runs VALUES (?, ?)", (datetime.utcnow().isoformat(), records)
+        )
+
+
+def _has_data() -> bool:
+    row = _connect().execute("SELECT 1 FROM ingestion_runs WHERE records > 0 LIMIT 1").fetchone()
+    return row is not None
+
+
+def _query_latest(state: str, district: str, market: str, commodity: str) -> List[dict]:
+    rows = _connect().execute(
+        """
+        SELECT * FROM mandi_prices
+        WHERE state = ? AND district = ? AND commodity = ? AND market = ?
+          AND arrival_date = (
+              SELECT MAX(arrival_date) FROM mandi_prices
+              WHERE state = ? AND district = ? AND commodity = ? AND market = ?
+          )
+        ORDER BY variety
+        """,
+        (state, district, commodity, market) * 2,
+    ).fetchall()
+    return [_to_record(row) for row in rows]
+
+
+def _query_history(state: str, district: str, commodity: str, since: str) -> List[tuple]:
+    # Several varieties can be quoted for one market and day; average them into one point
+    return _connect().execute(
+        """
+        SELECT market, arrival_date, AVG(modal_price)
+        FROM mandi_prices
+        WHERE state = ? AND district = ? AND commodity = ? AND arrival_date >= ?
+          AND modal_price IS NOT NULL
+        GROUP BY market, arrival_date
+        ORDER BY market, arrival_date
+        """,
+        (state, district, commodity, since),
+    ).fetchall()
+
+
+async def ingest_market_prices() -> int:
+    """
+    Pages through the full daily mandi price resource and upserts every record
+    into the local store. Returns the number of records written.
+    """
+    start = time.perf_counter()
+    offset, written = 0, 0
+    while True:
+        params = {
+            "api-key": DATA_GOV_IN_API_KEY,
+            "format": "json",
+            "offset": offset,
+            "limit": MARKET_INGEST_PAGE_SIZE,
+        }
+        response = await request_with_retry("datagov", "GET", MANDI_PRICES_URL, params=params)
+        response.raise_for_status()
+        payload = response.json()
+        records = payload.get("records", [])
+        if not records:
+            break
+        written += await asyncio.to_thread(_write_records, records)
+        offset += len(records)
+        total = int(payload.get("total") or 0)
+        if total and offset >= total:
+            break
+
+    await asyncio.to_thread(_record_run, written)
+    global _store_ready
+    _store_ready = _store_ready or written > 0
+    print(f"Ingested {written} mandi price records in {time.perf_counter() - start:.1f}s")
+    return written
+
+
+async def store_has_data() -> bool:
+    """True once at least one ingestion run has written records."""
+    global _store_ready
+    if not _store_ready:
+        _store_ready = await asyncio.to_thread(_has_data)
+    return _store_ready
+
+
+async def get_latest_prices(state: str, district: str, market: str, commodity: str) -> List[dict]:
+    """Returns the most recent day's records for a market and commodity. Matching is case-insensitive."""
+    return await asyncio.to_thread(
+        _query_latest, state.strip(), district.strip(), market.strip(), commodity.strip()
+    )
+
+
+async def get_price_history(state: str, district: str, commodity: str, since: date) -> Dict[str, np.ndarray]:
+    """
+    Returns the daily modal price history for every market in a district since
+    `since`, as parallel NumPy arrays: "market" (str), "date" (datetime64[D])
+    and "modal_price" (float64), sorted by market and date.
+    """
+    rows = await asyncio.to_thread(
+        _query_history, state.strip(), district.strip(), commodity.strip(), since.isoformat()
+    )
+    if not rows:
+        return {
+            "market": np.array([], dtype=str),
+            "date": np.array([], dtype="datetime64[D]"),
+            "modal_price": np.array([], dtype=np.float64),
+        }
+    markets, dates, prices = zip(*rows)
+    return {
+        "market": np.array(markets, dtype=str),
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "modal_price": np.array(prices, dtype=np.float64),
+    }
+
+
+if __name__ == "__main__":
+    # Manual one-off ingestion: python -m app.services.market_store
+    asyncio.run(ingest_market_prices())
@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+from typing import Dict, Optional
+import numpy as np
+from app.services.market_store import get_price_history
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over the last `window` points; the first points average what is available."""
+    n = values.size
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, n + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def volatility_pct(values: np.ndarray) -> Optional[float]:
+    """Standard deviation of day-to-day log returns, in percent."""
+    if values.size < 3 or np.any(values <= 0):
+        return None
+    return float(np.std(np.diff(np.log(values)), ddof=1) * 100)
+
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def compute_trends(history: Dict[str, np.ndarray], market: str, window: int) -> dict:
+    """
+    Aggregates a district's price history (as returned by get_price_history)
+    into trend figures for `market` and a comparison against the other markets.
+    """
+    markets = np.char.lower(history["market"])
+    dates = history["date"]
+    prices = history["modal_price"]
+    selected = markets == market.strip().lower()
+
+    result = {"series": [], "nearby_markets": []}
+    if not selected.any():
+        return result
+
+    # History is sorted by market then date, so the selected slice is chronological
+    own_dates, own_prices = dates[selected], prices[selected]
+    rolling = rolling_mean(own_prices, window)
+    latest = own_prices[-1]
+    result.update({
+        "start_date": str(own_dates[0]),
+        "end_date": str(own_dates[-1]),
+        "latest_modal_price": _round(latest),
+        "average_modal_price": _round(own_prices.mean()),
+        "rolling_avg": _round(rolling[-1]),
+        "change_pct": _round((latest - own_prices[0]) / own_prices[0] * 100) if own_prices[0] else None,
+        "volatility_pct": _round(volatility_pct(own_prices)),
+        "series": [
+            {"arrival_date": str(d), "modal_price": _round(p), "rolling_avg": _round(r)}
+            for d, p, r in zip(own_dates, own_prices, rolling)
+        ],
+    })
+
+    # Per-market mean and latest price in one pass over the whole district
+    names, first_index, inverse = np.unique(markets, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse)
+    means = np.bincount(inverse, weights=prices) / counts
+    last_index = first_index + counts - 1
+    display_names = history["market"][first_index]
+    for i, name in enumerate(names):
+        if name == market.strip().lower():
+            continue
+        other_latest = prices[last_index[i]]
+        result["nearby_markets"].append({
+            "market": str(display_names[i]),
+            "latest_modal_price": _round(other_latest),
+            "average_modal_price": _round(means[i]),
+            "diff_from_selected_pct": _round((other_latest - latest) / latest * 100) if latest else None,
+        })
+    result["nearby_markets"].sort(key=lambda m: m["latest_modal_price"], reverse=True)
+    return result
+
+
+async def get_market_trends(state: str, district: str, market: str, commodity: str, days: int = 30, window: int = 7) -> dict:
+    """Trend figures for a market over the last `days` days, read from the local mandi store."""
+    since = date.today() - timedelta(days=days)
+    history = await get_price_history(state, district, commodity, since)
+    return compute_trends(history, market, window)
+
+
+def summarize_trends_for_llm(trends: dict, market: str, commodity: str, max_nearby: int = 3) -> str:
+    """Condenses trend figures to a couple of lines for the advisory prompt."""
+    if trends.get("latest_modal_price") is None:
+        return f"No recent price data for {commodity} at {market}."
+    # Figures that short histories cannot support (None) are left out rather than printed
+    figures = [f"latest modal price Rs {trends['latest_modal_price']}/quintal ({trends['end_date']})"]
+    if trends.get("rolling_avg") is not None:
+        figures.append(f"rolling avg Rs {trends['rolling_avg']}")
+    if trends.get("change_pct") is not None:
+        figures.append(f"change {trends['change_pct']}% since {trends['start_date']}")
+    if trends.get("volatility_pct") is not None:
+        figures.append(f"volatility {trends['volatility_pct']}%")
+    summary = f"{commodity} at {market}: " + ", ".join(figures) + "."
+    nearby = [
+        f"{m['market']} Rs {m['latest_modal_price']} ({m['diff_from_selected_pct']:+}%)"
+        for m in trends.get("nearby_markets", [])[:max_nearby]
+        if m["diff_from_selected_pct"] is not None
+    ]
+    if nearby:
+        summary += " Nearby markets: " + ", ".join(nearby) + "."
+    return summary
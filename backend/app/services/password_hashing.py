@@ -0,0 +1,43 @@
+import os
+from passlib.context import CryptContext
+from app.services.worker_pool import WorkerPool
+
+# bcrypt is deliberately slow (~100-300 ms per call) and holds the GIL, so it
+# runs in worker processes instead of threads of the API process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    try:
+        return pwd_context.verify(password, password_hash)
+    except ValueError:
+        # Malformed or unknown hash
+        return False
+
+
+_pool = WorkerPool("password hashing", PASSWORD_HASH_WORKERS)
+
+
+async def _run(func, *args):
+    # Started on first use; most requests never hash a password
+    if not _pool.running:
+        await _pool.start()
+    return await _pool.run(func, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await _run(_verify, password, password_hash)
+
+
+async def stop_password_hashing():
+    await _pool.stop()
@@ -0,0 +1,102 @@
+import io
+import os
+from typing import Optional
+import numpy as np
+from PIL import Image
+from app.services.worker_pool import WorkerPool
+
+# Path to an ONNX image classifier (e.g. an int8-quantized MobileNet) trained
+# on healthy vs. unhealthy leaves. Unset disables the pre-classifier.
+PLANT_CLASSIFIER_MODEL = os.getenv("PLANT_CLASSIFIER_MODEL")
+PLANT_CLASSIFIER_WORKERS = int(os.getenv("PLANT_CLASSIFIER_WORKERS", "2"))
+PLANT_CLASSIFIER_INPUT_SIZE = int(os.getenv("PLANT_CLASSIFIER_INPUT_SIZE", "224"))
+# Output index of the "healthy" class for two-class models; single-output
+# models are read as a sigmoid logit for "healthy"
+PLANT_CLASSIFIER_HEALTHY_INDEX = int(os.getenv("PLANT_CLASSIFIER_HEALTHY_INDEX", "1"))
+# Only answer "healthy" locally when at least this confident; everything else goes to the LLM
+PLANT_CLASSIFIER_HEALTHY_THRESHOLD = float(os.getenv("PLANT_CLASSIFIER_HEALTHY_THRESHOLD", "0.9"))
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# Set in each worker process by _init_worker
+_session = None
+_input_name = None
+
+
+def _init_worker(model_path: str):
+    global _session, _input_name
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    # One thread per worker; parallelism comes from the pool
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    _session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    _input_name = _session.get_inputs()[0].name
+
+
+def _preprocess(data: bytes) -> np.ndarray:
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    image = image.resize((PLANT_CLASSIFIER_INPUT_SIZE, PLANT_CLASSIFIER_INPUT_SIZE), Image.BILINEAR)
+    array = (np.asarray(image, dtype=np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+    return array.transpose(2, 0, 1)[np.newaxis, ...]
+
+
+def _healthy_probability(data: bytes) -> float:
+    """Runs in a worker process. Returns P(healthy) for one image."""
+    logits = np.asarray(_session.run(None, {_input_name: _preprocess(data)})[0], dtype=np.float64).ravel()
+    if logits.size == 1:
+        return float(1.0 / (1.0 + np.exp(-logits[0])))
+    # Softmax unless the model already emits probabilities
+    if np.any(logits < 0) or not np.isclose(logits.sum(), 1.0, atol=1e-3):
+        logits = np.exp(logits - logits.max())
+        logits /= logits.sum()
+    return float(logits[PLANT_CLASSIFIER_HEALTHY_INDEX])
+
+
+def _warm_up() -> bool:
+    return _session is not None
+
+
+_pool = WorkerPool("plant classifier", PLANT_CLASSIFIER_WORKERS, _init_worker, (PLANT_CLASSIFIER_MODEL,))
+
+
+def classifier_enabled() -> bool:
+    return _pool.running
+
+
+async def start_classifier():
+    """Starts the worker pool and loads the model once per worker. Called on app startup."""
+    if not PLANT_CLASSIFIER_MODEL or _pool.running:
+        return
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("onnxruntime is not installed; plant pre-classifier disabled")
+        return
+    if not os.path.exists(PLANT_CLASSIFIER_MODEL):
+        print(f"Plant classifier model not found at {PLANT_CLASSIFIER_MODEL}; pre-classifier disabled")
+        return
+
+    try:
+        await _pool.start(_warm_up)
+    except Exception as e:
+        # A corrupt or incompatible model must not take the app down; diagnosis works without it
+        print(f"Plant classifier failed to load {PLANT_CLASSIFIER_MODEL}: {str(e)}; pre-classifier disabled")
+        return
+    print(f"Plant pre-classifier loaded from {PLANT_CLASSIFIER_MODEL}")
+
+
+async def stop_classifier():
+    await _pool.stop()
+
+
+async def healthy_probability(data: bytes) -> Optional[float]:
+    """Returns P(healthy) from the local classifier, or None if it is disabled or fails."""
+    if not _pool.running:
+        return None
+    try:
+        return await _pool.run(_healthy_probability, data)
+    except Exception as e:
+        print(f"Plant pre-classifier failed: {str(e)}")
+        return None
@@ -1,66 +1,102 @@
 import google.generativeai as genai
+from typing import AsyncIterator
 from app.core.config import GEMINI_API_KEY
-from app.services.gemini_client import call_gemini
+from app.models.weather import AdviceResponse
+from app.services.gemini_client import GEMINI_ERROR_MESSAGE, call_gemini_async, json_generation_config, stream_gemini
+from app.services.structured_output import parse_model
+from app.utils.prompt_manager import render_prompt
 
 # Initialize Gemini
 # genai.configure(api_key=GEMINI_API_KEY)
 
-async def generate_farming_advice_gemini(forecast_data: dict, location: str, language: str = "en") -> dict:
-    """
-    Generate actionable farming advice using Gemini model.
-    """
-    
+# Plain-text layout used when the advice is streamed straight to the farmer
+TEXT_RESPONSE_FORMAT = """Give response in the following format:
+Summary : 
+<summary>
+Reasoning : 
+<reasoning>
+Recommended Actions:
+- <action 1>
+- <action 2>
+- <action 3>"""
 
-    prompt = f"""
-    You are an agricultural expert assisting farmers.
-    Analyze the weather forecast data and provide:
-    1. Short summary of upcoming weather
-    2. Reasoning why this matters for farming
-    3. 3 clear actionable steps for farmers
-    Language: {language}
+JSON_RESPONSE_FORMAT = """Return only a JSON object with the keys "summary" (string), "reasoning" (string) and "recommended_actions" (list of 3 strings)."""
 
-    Forecast Data:
-    {forecast_data}
+ADVICE_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "reasoning": {"type": "STRING"},
+        "recommended_actions": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["summary", "reasoning", "recommended_actions"],
+}
 
-    Give response in the following format:
-    Summary : 
-    <summary>
-    Reasoning : 
-    <reasoning>
-    Recommended Actions:
-    - <action 1>
-    - <action 2>
-    - <action 3>
-    Location: {location}
+def build_farming_advice_prompt(forecast_data: dict, location: str, language: str = "en", response_format: str = TEXT_RESPONSE_FORMAT) -> str:
+    return render_prompt(
+        name="weather_advice_prompt",
+        forecast_data=forecast_data,
+        location=location,
+        language=language,
+        response_format=response_format
+    )
 
-    NOTE - keep the keys in english, but the values can be in the requested language.
-    Make sure to provide clear, actionable advice that a farmer can follow.
-    Use bullet points for actions.
-    Keep the response concise and focused on practical steps.
+async def generate_farming_advice_gemini(forecast_data: dict, location: str, language: str = "en") -> dict:
+    """
+    Generate actionable farming advice using Gemini model. The model is asked
+    for JSON matching AdviceResponse; text that does not parse as such falls
+    back to the section layout. Raises ValueError if Gemini failed or nothing
+    usable could be parsed, rather than returning empty advice.
     """
+    prompt = build_farming_advice_prompt(forecast_data, location, language, JSON_RESPONSE_FORMAT)
     print(f"Prompt for Gemini:\n{prompt}\n")
-    response = call_gemini(prompt)
+    response = await call_gemini_async(prompt, json_generation_config(ADVICE_RESPONSE_SCHEMA))
     print(response)
-    text = response 
 
-    # Simple parsing: Expect model to return structured text
+    if response == GEMINI_ERROR_MESSAGE:
+        raise ValueError("Could not generate farming advice: the AI model did not respond.")
+    try:
+        advice = parse_model(response, AdviceResponse)
+    except ValueError:
+        fallback = parse_advice_text(response)
+        if not fallback["summary"]:
+            raise ValueError("Could not generate farming advice: the AI response could not be parsed.")
+        return fallback
     return {
-        "summary": extract_section(text, "Summary"),
-        "reasoning": extract_section(text, "Reasoning"),
-        "recommended_actions": extract_actions(text)
+        "summary": advice.summary,
+        "reasoning": advice.reasoning,
+        "recommended_actions": advice.recommended_actions[:3]
     }
 
-def extract_section(text: str, section: str) -> str:
-    # Simple parsing helper
-    lines = text.split("\n")
-    for i, line in enumerate(lines):
-        if section.lower() in line.lower():
-            return lines[i+1].strip() if i+1 < len(lines) else ""
-    return ""
+async def stream_farming_advice_gemini(forecast_data: dict, location: str, language: str = "en") -> AsyncIterator[str]:
+    """
+    Streams the raw farming advice text as Gemini generates it.
+    """
+    prompt = build_farming_advice_prompt(forecast_data, location, language)
+    async for chunk in stream_gemini(prompt):
+        yield chunk
 
-def extract_actions(text: str) -> list:
+def parse_advice_text(text: str) -> dict:
+    """Splits advice written in TEXT_RESPONSE_FORMAT into its sections in a single pass over the lines."""
+    sections = {"summary": "", "reasoning": ""}
     actions = []
+    pending = None
     for line in text.split("\n"):
-        if line.strip().startswith(("-", "•", "1", "2", "3")):
-            actions.append(line.strip("-•0123456789. ").strip())
-    return actions[:3]
+        stripped = line.strip()
+        if pending is not None:
+            sections[pending] = stripped
+            pending = None
+            continue
+        lowered = stripped.lower()
+        for section in sections:
+            if section in lowered and not sections[section]:
+                pending = section
+                break
+        else:
+            if stripped.startswith(("-", "•", "1", "2", "3")):
+                actions.append(stripped.strip("-•0123456789. ").strip())
+    return {
+        "summary": sections["summary"],
+        "reasoning": sections["reasoning"],
+        "recommended_actions": actions[:3]
+    }
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Awaitable, Callable, List
+
+_tasks: List[asyncio.Task] = []
+
+
+async def _run_periodically(name: str, interval: float, job: Callable[[], Awaitable], initial_delay: float):
+    await asyncio.sleep(initial_delay)
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # A failed run must not kill the schedule; the next tick retries
+            print(f"Scheduled job '{name}' failed: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+def schedule_periodic(name: str, interval: float, job: Callable[[], Awaitable], initial_delay: float = 0) -> asyncio.Task:
+    """Runs `job` every `interval` seconds in the background until stop_scheduled_jobs()."""
+    task = asyncio.create_task(_run_periodically(name, interval, job, initial_delay), name=name)
+    _tasks.append(task)
+    return task
+
+
+async def stop_scheduled_jobs():
+    """Cancels every scheduled job. Called on app shutdown."""
+    tasks = list(_tasks)
+    _tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
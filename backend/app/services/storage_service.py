@@ -0,0 +1,82 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+from app.services.gcs_service import GCSStorageBackend
+from app.services.http_clients import PayloadTooLargeError
+
+load_dotenv()
+
+# "gcs" uploads to BUCKET_NAME; "local" writes under LOCAL_STORAGE_DIR, which
+# lets the upload path run in development and tests without GCP credentials.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+BUCKET_NAME = os.getenv("BUCKET_NAME")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "data/uploads")
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "/media")
+# Size of each read from the incoming multipart body
+UPLOAD_READ_SIZE = int(os.getenv("UPLOAD_READ_SIZE", str(256 * 1024)))
+
+
+class LocalStorageBackend:
+    """Stores objects on the local filesystem and serves them from LOCAL_STORAGE_BASE_URL."""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Returns the object key if `url` points into this store."""
+        prefix = f"{self.base_url}/"
+        if url.startswith(prefix):
+            return url[len(prefix):].split("?", 1)[0]
+        return None
+
+    async def download(self, key: str, max_bytes: Optional[int] = None) -> bytes:
+        """
+        Reads an object. Raises FileNotFoundError if it does not exist and
+        PayloadTooLargeError if it is larger than `max_bytes`.
+        """
+        path = self._path(key)
+        if max_bytes is not None and (await asyncio.to_thread(path.stat)).st_size > max_bytes:
+            raise PayloadTooLargeError(f"Object {key} exceeds {max_bytes} bytes")
+        return await asyncio.to_thread(path.read_bytes)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    async def upload_bytes(self, key: str, data: bytes, content_type: str) -> str:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(path.write_bytes, data)
+        return self.public_url(key)
+
+
+_backend = None
+
+def get_storage_backend():
+    """Returns the configured storage backend, shared by every upload."""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "local":
+            _backend = LocalStorageBackend(LOCAL_STORAGE_DIR, LOCAL_STORAGE_BASE_URL)
+        else:
+            if not BUCKET_NAME:
+                raise ValueError("BUCKET_NAME must be set when STORAGE_BACKEND is 'gcs'")
+            _backend = GCSStorageBackend(BUCKET_NAME)
+    return _backend
+
+
+async def iter_upload(file, chunk_size: int = UPLOAD_READ_SIZE) -> AsyncIterator[bytes]:
+    """Reads an UploadFile in chunks without loading it into memory."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
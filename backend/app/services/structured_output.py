@@ -0,0 +1,131 @@
+import json
+from typing import Any, Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar("T", bound=BaseModel)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONStreamParser:
+    """
+    Incremental, tolerant JSON extractor for LLM output. Text is fed in chunks
+    (e.g. as it streams from the model) and scanned once: leading prose and
+    code fences are skipped, brackets are tracked outside of strings, and
+    trailing commas before a closing bracket are dropped. `feed` returns the
+    first complete top-level object or array once its closing bracket arrives.
+    A candidate that turns out not to be JSON (a brace in prose, a mismatched
+    bracket) is abandoned and scanning resumes after its opening bracket; call
+    `close` at the end of input to do the same for a candidate left unclosed.
+    """
+
+    def __init__(self):
+        self._reset()
+        self.result: Any = None
+        self.done = False
+
+    def _reset(self):
+        self._buffer = []
+        self._raw = []
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._pending_comma = False
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        pending = chunk
+        while pending and not self.done:
+            pending = self._scan(pending)
+        return self.result if self.done else None
+
+    def close(self) -> Optional[Any]:
+        """Marks the end of input, retrying past an opening bracket that never closed."""
+        while not self.done and self._raw:
+            rest = "".join(self._raw[1:])
+            self._reset()
+            self.feed(rest)
+        return self.result if self.done else None
+
+    def _retry(self, rest: str) -> str:
+        # Rescan everything after the abandoned candidate's opening bracket
+        text = "".join(self._raw[1:]) + rest
+        self._reset()
+        return text
+
+    def _scan(self, chunk: str) -> str:
+        """Consumes `chunk`; returns text that has to be scanned again after a failed candidate."""
+        for index, char in enumerate(chunk):
+            if not self._stack:
+                if char in _CLOSERS:
+                    self._stack.append(_CLOSERS[char])
+                    self._buffer.append(char)
+                    self._raw.append(char)
+                continue
+            self._raw.append(char)
+
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char.isspace():
+                continue
+            if char == ",":
+                # Hold the comma until we know whether a value follows it
+                self._pending_comma = True
+                continue
+            if self._pending_comma:
+                if char not in ("}", "]"):
+                    self._buffer.append(",")
+                self._pending_comma = False
+
+            self._buffer.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(_CLOSERS[char])
+            elif char in ("}", "]"):
+                if char != self._stack[-1]:
+                    return self._retry(chunk[index + 1:])
+                self._stack.pop()
+                if not self._stack:
+                    try:
+                        self.result = json.loads("".join(self._buffer))
+                    except json.JSONDecodeError:
+                        return self._retry(chunk[index + 1:])
+                    self.done = True
+                    return ""
+        return ""
+
+
+def extract_json(text: str) -> Any:
+    """Returns the first JSON object or array in `text`. Raises ValueError if there is none."""
+    parser = JSONStreamParser()
+    parser.feed(text)
+    parser.close()
+    if not parser.done:
+        raise ValueError("No valid JSON block found in AI response.")
+    return parser.result
+
+
+def parse_model(text: str, model: Type[T]) -> T:
+    """
+    Validates LLM output into a Pydantic model. Output produced in JSON mode is
+    parsed directly; anything else goes through the tolerant extractor.
+    Raises ValueError if no valid object can be recovered.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = extract_json(text)
+    if not isinstance(data, dict):
+        raise ValueError("AI response is not a JSON object.")
+    try:
+        return model(**data)
+    except ValidationError as e:
+        raise ValueError(f"Incomplete AI response structure: {str(e)}") from None
@@ -1,6 +1,218 @@
 import asyncio
+import json
+import os
+from typing import AsyncIterator, Optional
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+from app.services.worker_pool import WorkerPool
+
+# faster-whisper model name or path (tiny, base, small, ...). Unset disables STT.
+STT_MODEL = os.getenv("STT_MODEL")
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "2"))
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+
+# Clients stream raw 16-bit little-endian mono PCM at this rate
+STT_SAMPLE_RATE = int(os.getenv("STT_SAMPLE_RATE", "16000"))
+BYTES_PER_SECOND = STT_SAMPLE_RATE * 2
+# Re-transcribe the utterance for a partial result after this much new audio
+STT_PARTIAL_INTERVAL = float(os.getenv("STT_PARTIAL_INTERVAL", "1.0"))
+# Trailing silence that ends an utterance, and the RMS level (0-1) counted as silence
+STT_ENDPOINT_SILENCE = float(os.getenv("STT_ENDPOINT_SILENCE", "0.8"))
+STT_SILENCE_RMS = float(os.getenv("STT_SILENCE_RMS", "0.01"))
+STT_MAX_UTTERANCE_SECONDS = float(os.getenv("STT_MAX_UTTERANCE_SECONDS", "30"))
+# Frames buffered per socket; when full the socket is not read until the
+# transcriber catches up, which pushes back on the client through TCP
+STT_QUEUE_FRAMES = int(os.getenv("STT_QUEUE_FRAMES", "64"))
+
+# Set in each worker process by _init_worker
+_model = None
+
+_CLOSED = object()
+
+
+def _init_worker(model_name: str, compute_type: str, cpu_threads: int):
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _transcribe(pcm: bytes, language: Optional[str], final: bool) -> str:
+    """Runs in a worker process. Transcribes 16-bit PCM; partials use greedy decoding."""
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    segments, _ = _model.transcribe(
+        audio,
+        language=language,
+        beam_size=5 if final else 1,
+        condition_on_previous_text=False,
+    )
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+def _warm_up() -> bool:
+    return _model is not None
+
+
+_pool = WorkerPool("speech recognition", STT_WORKERS, _init_worker, (STT_MODEL, STT_COMPUTE_TYPE, STT_CPU_THREADS))
+
+
+def stt_enabled() -> bool:
+    return _pool.running
+
+
+async def start_stt():
+    """Starts the worker pool and loads the speech model once per worker. Called on app startup."""
+    if not STT_MODEL or _pool.running:
+        return
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        print("faster-whisper is not installed; speech recognition disabled")
+        return
+
+    await _pool.start(_warm_up)
+    print(f"Speech recognition model '{STT_MODEL}' loaded")
+
+
+async def stop_stt():
+    await _pool.stop()
+
+
+async def transcribe(pcm: bytes, language: Optional[str] = None, final: bool = True) -> str:
+    """Transcribes 16-bit mono PCM in the worker pool. Raises RuntimeError if STT is not configured."""
+    if not _pool.running:
+        raise RuntimeError("Speech recognition is not configured.")
+    # Drop a dangling odd byte rather than fail on a partial sample
+    pcm = pcm[:len(pcm) - len(pcm) % 2]
+    return await _pool.run(_transcribe, pcm, language, final)
+
 
 async def speech_to_text(audio_bytes: bytes) -> str:
-    # Dummy: In real use, call your STT API/service here
-    # Return transcribed text
-    return "Transcribed text placeholder"
\ No newline at end of file
+    """Transcribes one complete utterance of 16-bit mono PCM."""
+    return await transcribe(audio_bytes)
+
+
+def _rms(frame: bytes) -> float:
+    samples = np.frombuffer(frame[:len(frame) - len(frame) % 2], dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean((samples.astype(np.float32) / 32768.0) ** 2)))
+
+
+async def transcribe_stream(frames: AsyncIterator[Optional[bytes]], language: Optional[str] = None) -> AsyncIterator[dict]:
+    """
+    Turns a stream of PCM frames into transcript events. Yields
+    {"type": "partial", "text"} while the speaker is talking and
+    {"type": "final", "text"} when an utterance ends: after
+    STT_ENDPOINT_SILENCE seconds of silence, at STT_MAX_UTTERANCE_SECONDS, on a
+    None frame (the client's end-of-utterance marker), or when the stream ends.
+    """
+    buffer = bytearray()
+    new_audio = 0.0
+    silence = 0.0
+    heard_speech = False
+
+    async def finish():
+        nonlocal buffer, new_audio, silence, heard_speech
+        pcm, spoken = bytes(buffer), heard_speech
+        buffer, new_audio, silence, heard_speech = bytearray(), 0.0, 0.0, False
+        if spoken:
+            text = await transcribe(pcm, language, final=True)
+            if text:
+                return {"type": "final", "text": text}
+        return None
+
+    async for frame in frames:
+        if frame is None:
+            event = await finish()
+            if event:
+                yield event
+            continue
+
+        seconds = len(frame) / BYTES_PER_SECOND
+        buffer.extend(frame)
+        new_audio += seconds
+        if _rms(frame) < STT_SILENCE_RMS:
+            silence += seconds
+        else:
+            silence = 0.0
+            heard_speech = True
+
+        if not heard_speech:
+            # Keep only a short lead-in while nobody is speaking
+            keep = int(STT_PARTIAL_INTERVAL * BYTES_PER_SECOND)
+            del buffer[:-keep]
+            new_audio = 0.0
+        elif silence >= STT_ENDPOINT_SILENCE or len(buffer) >= STT_MAX_UTTERANCE_SECONDS * BYTES_PER_SECOND:
+            event = await finish()
+            if event:
+                yield event
+        elif new_audio >= STT_PARTIAL_INTERVAL:
+            new_audio = 0.0
+            text = await transcribe(bytes(buffer), language, final=False)
+            if text:
+                yield {"type": "partial", "text": text}
+
+    event = await finish()
+    if event:
+        yield event
+
+
+def _discard(queue: asyncio.Queue):
+    while not queue.empty():
+        queue.get_nowait()
+
+
+async def websocket_audio_frames(websocket: WebSocket) -> AsyncIterator[Optional[bytes]]:
+    """
+    Yields binary frames from the socket through a bounded queue, and None for
+    each {"type": "end"} text message. Stops after the buffered frames when the
+    client sends {"type": "close"}. Raises WebSocketDisconnect as soon as the
+    client disconnects, without transcribing the audio still buffered.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STT_QUEUE_FRAMES)
+
+    async def read():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    # Nobody is left to send transcripts to
+                    _discard(queue)
+                    await queue.put(WebSocketDisconnect(message.get("code", 1000)))
+                    return
+                if message.get("bytes") is not None:
+                    await queue.put(message["bytes"])
+                    continue
+                try:
+                    control = json.loads(message.get("text") or "")
+                except ValueError:
+                    continue
+                if not isinstance(control, dict):
+                    continue
+                if control.get("type") == "end":
+                    await queue.put(None)
+                elif control.get("type") == "close":
+                    break
+            await queue.put(_CLOSED)
+        except asyncio.CancelledError:
+            # The consumer is gone; never block on a full queue here
+            _discard(queue)
+            queue.put_nowait(_CLOSED)
+            raise
+        except Exception as e:
+            # The socket failed: hand the error to the consumer
+            _discard(queue)
+            queue.put_nowait(e)
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            frame = await queue.get()
+            if frame is _CLOSED:
+                break
+            if isinstance(frame, Exception):
+                raise frame
+            yield frame
+    finally:
+        reader.cancel()
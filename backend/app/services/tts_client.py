@@ -1,6 +1,168 @@
 import asyncio
+import hashlib
+import io
+import os
+import re
+import wave
+from typing import AsyncIterator, Iterable, List, Optional, Union
+from app.services.cache import TTLCache
+from app.services.worker_pool import WorkerPool
+
+# Path to a Piper voice (.onnx with its .onnx.json next to it). Unset disables TTS.
+TTS_MODEL = os.getenv("TTS_MODEL")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+# Sentences synthesized ahead of the one currently being sent
+TTS_MAX_PENDING = int(os.getenv("TTS_MAX_PENDING", "4"))
+# Synthesized sentences keyed by content hash; advisories repeat a lot of phrasing
+TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "2000"))
+TTS_CACHE_TTL = float(os.getenv("TTS_CACHE_TTL", str(7 * 24 * 60 * 60)))
+# Raw PCM is large (~32 KB per second of 16 kHz speech), so the cache is also bounded by size
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+# Sentence ends: Latin punctuation, the Devanagari danda, and line breaks
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+
+_audio_cache = TTLCache(maxsize=TTS_CACHE_MAX_ENTRIES, ttl=TTS_CACHE_TTL, max_bytes=TTS_CACHE_MAX_BYTES)
+sample_rate: Optional[int] = None
+
+# Set in each worker process by _init_worker
+_voice = None
+
+
+def _init_worker(model_path: str):
+    global _voice
+    from piper import PiperVoice
+    _voice = PiperVoice.load(model_path)
+
+
+def _synthesize(text: str) -> bytes:
+    """Runs in a worker process. Returns 16-bit mono PCM for one sentence."""
+    if hasattr(_voice, "synthesize_stream_raw"):
+        return b"".join(_voice.synthesize_stream_raw(text))
+    return b"".join(chunk.audio_int16_bytes for chunk in _voice.synthesize(text))
+
+
+def _warm_up() -> int:
+    return _voice.config.sample_rate
+
+
+_pool = WorkerPool("speech synthesis", TTS_WORKERS, _init_worker, (TTS_MODEL,))
+
+
+def tts_enabled() -> bool:
+    return _pool.running
+
+
+async def start_tts():
+    """Starts the worker pool and loads the voice once per worker. Called on app startup."""
+    global sample_rate
+    if not TTS_MODEL or _pool.running:
+        return
+    try:
+        import piper  # noqa: F401
+    except ImportError:
+        print("piper-tts is not installed; speech synthesis disabled")
+        return
+    if not os.path.exists(TTS_MODEL):
+        print(f"TTS voice not found at {TTS_MODEL}; speech synthesis disabled")
+        return
+
+    rates = await _pool.start(_warm_up)
+    if rates:
+        sample_rate = rates[0]
+    print(f"TTS voice loaded from {TTS_MODEL}")
+
+
+async def stop_tts():
+    await _pool.stop()
+
+
+class SentenceSplitter:
+    """Incrementally cuts streamed text into sentences as their ends arrive."""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text: str) -> List[str]:
+        parts = _SENTENCE_END.split(self._pending + text)
+        self._pending = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self) -> List[str]:
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str) -> List[str]:
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+async def synthesize_sentence(sentence: str) -> bytes:
+    """Returns PCM for one sentence, from the audio cache when it was spoken before."""
+    if not _pool.running:
+        raise RuntimeError("Speech synthesis is not configured.")
+    normalized = " ".join(sentence.split())
+    key = hashlib.sha256(f"{TTS_MODEL}\x00{normalized}".encode("utf-8")).hexdigest()
+    return await _audio_cache.get_or_load(key, lambda: _pool.run(_synthesize, normalized))
+
+
+async def _iterate(sentences: Union[Iterable[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+    if hasattr(sentences, "__aiter__"):
+        async for sentence in sentences:
+            yield sentence
+    else:
+        for sentence in sentences:
+            yield sentence
+
+
+async def synthesize_sentences(sentences: Union[Iterable[str], AsyncIterator[str]]) -> AsyncIterator[bytes]:
+    """
+    Synthesizes sentences in parallel across the worker pool and yields their
+    PCM in input order, each as soon as it and every sentence before it is done.
+    At most TTS_MAX_PENDING sentences are in flight ahead of the consumer.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=TTS_MAX_PENDING)
+
+    async def schedule():
+        try:
+            async for sentence in _iterate(sentences):
+                await queue.put(asyncio.ensure_future(synthesize_sentence(sentence)))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(schedule())
+    try:
+        while True:
+            task = await queue.get()
+            if task is None:
+                break
+            yield await task
+        # Surface errors from the sentence source
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            task = queue.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+async def synthesize_stream(text: str) -> AsyncIterator[bytes]:
+    """Yields PCM sentence by sentence for a block of text."""
+    async for chunk in synthesize_sentences(split_sentences(text)):
+        yield chunk
+
 
 async def text_to_speech(text: str) -> bytes:
-    # Dummy: In real use, call your TTS API/service here
-    # Return bytes (e.g., WAV/MP3 audio)
-    return b"AUDIO_BYTES_PLACEHOLDER"
\ No newline at end of file
+    """Synthesizes the whole text and returns it as a WAV file."""
+    if not _pool.running:
+        raise RuntimeError("Speech synthesis is not configured.")
+    chunks = [chunk async for chunk in synthesize_stream(text)]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"".join(chunks))
+    return buffer.getvalue()
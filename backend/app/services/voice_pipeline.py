@@ -0,0 +1,57 @@
+import asyncio
+from typing import AsyncIterator, Union
+from app.services.coordinator_service import stream_holistic_advisory
+from app.services.tts_client import SentenceSplitter, synthesize_sentences, tts_enabled
+
+_DONE = object()
+
+
+async def stream_voice_advisory(query: str, **advisory_args) -> AsyncIterator[Union[dict, bytes]]:
+    """
+    Runs the streaming advisory for a spoken query and speaks it as it is
+    generated. Yields the advisory's events as dicts ({"type": "tool" | "token", ...})
+    interleaved with PCM audio (bytes) for each finished sentence, and a final
+    {"type": "done", ...} once the last sentence has been spoken. Sentences are
+    handed to TTS as soon as Gemini completes them, so speech starts while the
+    rest of the answer is still being written.
+    """
+    out: asyncio.Queue = asyncio.Queue()
+    done_event = {}
+
+    async def sentences() -> AsyncIterator[str]:
+        splitter = SentenceSplitter()
+        async for event in stream_holistic_advisory(query, **advisory_args):
+            if event["event"] == "done":
+                # Held back until the audio has caught up
+                done_event.update(event["data"])
+                continue
+            await out.put({"type": event["event"], **event["data"]})
+            if event["event"] == "token":
+                for sentence in splitter.feed(event["data"]["text"]):
+                    yield sentence
+        for sentence in splitter.flush():
+            yield sentence
+
+    async def speak():
+        try:
+            if tts_enabled():
+                async for chunk in synthesize_sentences(sentences()):
+                    await out.put(chunk)
+            else:
+                async for _ in sentences():
+                    pass
+        finally:
+            await out.put(_DONE)
+
+    speaker = asyncio.create_task(speak())
+    try:
+        while True:
+            item = await out.get()
+            if item is _DONE:
+                break
+            yield item
+        # Surface errors from the advisory or TTS
+        await speaker
+        yield {"type": "done", **done_event}
+    finally:
+        speaker.cancel()
@@ -1,41 +1,133 @@
-import datetime
 import os
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+
+# Agronomic thresholds used to flag days in the LLM summary
+HEAT_STRESS_TEMP_C = float(os.getenv("WEATHER_HEAT_STRESS_TEMP_C", "35"))
+# Daily total; IMD classifies 64.5 mm/day and above as heavy rain
+HEAVY_RAIN_MM = float(os.getenv("WEATHER_HEAVY_RAIN_MM", "64.5"))
+# Spraying is advised only in dry, calm daylight slots below this wind speed
+SPRAY_MAX_WIND_MPS = float(os.getenv("WEATHER_SPRAY_MAX_WIND_MPS", "4"))
+SPRAY_MAX_TEMP_C = float(os.getenv("WEATHER_SPRAY_MAX_TEMP_C", "30"))
+SPRAY_HOURS = (6, 18)
+
+
+@dataclass
+class ForecastColumns:
+    """The 3-hourly forecast as one typed array per field, with times in the location's local time."""
+    time: np.ndarray
+    temperature: np.ndarray
+    feels_like: np.ndarray
+    humidity: np.ndarray
+    pressure: np.ndarray
+    rain: np.ndarray
+    wind_speed: np.ndarray
+    wind_gust: np.ndarray
+    condition: np.ndarray
+
+
+def _column(entries: List[dict], section: str, field: str, default: float = np.nan) -> np.ndarray:
+    values = [(entry.get(section) or {}).get(field, default) for entry in entries]
+    return np.array(values, dtype=np.float64)
+
+
+def clean_weather_data(data: List[dict], timezone_offset: int = 0) -> ForecastColumns:
+    """
+    Parses the OpenWeather forecast `list` into columns once. Timestamps come
+    from the unix `dt` field shifted by `timezone_offset` (seconds east of UTC,
+    as in `city.timezone`), so no per-entry string parsing is needed.
+    """
+    timestamps = np.array([entry.get("dt", 0) for entry in data], dtype=np.int64)
+    return ForecastColumns(
+        time=(timestamps + timezone_offset).astype("datetime64[s]"),
+        temperature=_column(data, "main", "temp"),
+        feels_like=_column(data, "main", "feels_like"),
+        humidity=_column(data, "main", "humidity"),
+        pressure=_column(data, "main", "pressure"),
+        rain=_column(data, "rain", "3h", 0.0),  # mm in last 3h
+        wind_speed=_column(data, "wind", "speed", 0.0),
+        wind_gust=_column(data, "wind", "gust", 0.0),
+        condition=np.array([(entry.get("weather") or [{}])[0].get("description", "N/A") for entry in data], dtype=object),
+    )
 
-def clean_weather_data(data):
-    cleaned_data = []
-    for entry in data:
-        dt = entry.get('dt_txt', '')
-        temp = entry['main'].get('temp')
-        feels_like = entry['main'].get('feels_like')
-        humidity = entry['main'].get('humidity')
-        pressure = entry['main'].get('pressure')
-        rain = entry.get('rain', {}).get('3h', 0.0)  # mm in last 3h
-        wind_speed = entry.get('wind', {}).get('speed')
-        condition = entry['weather'][0].get('description', 'N/A')
-
-        cleaned_data.append({
-            "datetime": dt,
-            "temperature_C": round(temp, 1),
-            "feels_like_C": round(feels_like, 1),
-            "humidity_%": humidity,
-            "pressure_hPa": pressure,
-            "rain_mm": round(rain, 2),
-            "wind_speed_mps": round(wind_speed, 2),
-            "condition": condition
-        })
-    return cleaned_data
 
+def daily_summary(columns: ForecastColumns) -> List[dict]:
+    """Aggregates the forecast to one record per local day, with agronomic flags."""
+    if columns.time.size == 0:
+        return []
 
-def summarize_for_llm(cleaned_data):
+    days = columns.time.astype("datetime64[D]")
+    # Forecast entries are in time order, so each day is a contiguous run
+    day_values, starts = np.unique(days, return_index=True)
+    minutes = (columns.time - days).astype("timedelta64[m]").astype(np.int64)
+
+    temp_min = np.fmin.reduceat(columns.temperature, starts)
+    temp_max = np.fmax.reduceat(columns.temperature, starts)
+    rain_total = np.add.reduceat(columns.rain, starts)
+    wind_max = np.fmax.reduceat(columns.wind_speed, starts)
+    gust_max = np.fmax.reduceat(columns.wind_gust, starts)
+    humidity_sum = np.add.reduceat(np.nan_to_num(columns.humidity), starts)
+    humidity_count = np.add.reduceat((~np.isnan(columns.humidity)).astype(np.int64), starts)
+    humidity_mean = np.divide(humidity_sum, humidity_count, out=np.full(len(starts), np.nan), where=humidity_count > 0)
+
+    spray_ok = (
+        (columns.rain == 0)
+        & (columns.wind_speed < SPRAY_MAX_WIND_MPS)
+        & (columns.temperature < SPRAY_MAX_TEMP_C)
+        & (minutes >= SPRAY_HOURS[0] * 60)
+        & (minutes <= SPRAY_HOURS[1] * 60)
+    )
+
+    ends = np.append(starts[1:], columns.time.size)
     summary = []
-    for entry in cleaned_data:
-        dt_obj = datetime.datetime.strptime(entry['datetime'], '%Y-%m-%d %H:%M:%S')
-        time_str = dt_obj.strftime("%d %b %Y %I:%M %p")
-
-        rain_info = f"{entry['rain_mm']}mm rain" if entry['rain_mm'] > 0 else "no rain"
-        summary.append(
-            f"At {time_str}: {entry['condition'].capitalize()}, Temp {entry['temperature_C']}°C "
-            f"(Feels {entry['feels_like_C']}°C), Humidity {entry['humidity_%']}%, "
-            f"Wind {entry['wind_speed_mps']} m/s, {rain_info}."
-        )
-    return "\n".join(summary)
\ No newline at end of file
+    for i, day in enumerate(day_values):
+        run = slice(starts[i], ends[i])
+        conditions, counts = np.unique(columns.condition[run].astype(str), return_counts=True)
+        summary.append({
+            "date": day.astype(object),
+            "temp_min_C": round(float(temp_min[i]), 1),
+            "temp_max_C": round(float(temp_max[i]), 1),
+            "rain_mm": round(float(rain_total[i]), 1),
+            "humidity_%": None if np.isnan(humidity_mean[i]) else int(round(humidity_mean[i])),
+            "wind_max_mps": round(float(wind_max[i]), 1),
+            "gust_max_mps": round(float(gust_max[i]), 1),
+            "condition": conditions[np.argmax(counts)],
+            "heat_stress": bool(temp_max[i] >= HEAT_STRESS_TEMP_C),
+            "heavy_rain": bool(rain_total[i] >= HEAVY_RAIN_MM),
+            "spray_windows": [f"{m // 60:02d}:{m % 60:02d}" for m in minutes[run][spray_ok[run]]],
+        })
+    return summary
+
+
+def summarize_for_llm(columns: ForecastColumns) -> str:
+    """Renders the daily aggregates as one short line per day for the prompt."""
+    lines = []
+    for day in daily_summary(columns):
+        parts = [
+            f"{day['date'].strftime('%a %d %b')}: {day['condition'].capitalize()}",
+            f"{day['temp_min_C']}-{day['temp_max_C']}°C",
+            f"rain {day['rain_mm']}mm" if day["rain_mm"] > 0 else "no rain",
+        ]
+        if day["humidity_%"] is not None:
+            parts.append(f"humidity {day['humidity_%']}%")
+        wind = f"wind up to {day['wind_max_mps']} m/s"
+        if day["gust_max_mps"] > day["wind_max_mps"]:
+            wind += f" (gusts {day['gust_max_mps']})"
+        parts.append(wind)
+        if day["heat_stress"]:
+            parts.append("HEAT STRESS")
+        if day["heavy_rain"]:
+            parts.append("HEAVY RAIN")
+        if day["spray_windows"]:
+            parts.append("spray windows " + " ".join(day["spray_windows"]))
+        else:
+            parts.append("no spray window")
+        lines.append(", ".join(parts) + ".")
+    return "\n".join(lines)
+
+
+def summarize_forecast(data: dict) -> str:
+    """Compact daily summary of an OpenWeather 5-day forecast response."""
+    offset = (data.get("city") or {}).get("timezone", 0)
+    return summarize_for_llm(clean_weather_data(data.get("list", []), offset))
@@ -0,0 +1,60 @@
+import math
+import os
+from typing import Tuple
+from dotenv import load_dotenv
+from app.services.cache import TTLCache
+from app.services.http_clients import request_with_retry
+
+load_dotenv()
+
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+OPENWEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
+
+# Nearby coordinates share one cache entry: lat/lon are snapped to the centre of
+# a WEATHER_GRID_DEGREES cell (0.05° is roughly 5.5 km).
+WEATHER_GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", "0.05"))
+# The 5-day forecast advances in 3-hour steps; current conditions change faster.
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", str(3 * 60 * 60)))
+CURRENT_WEATHER_CACHE_TTL = float(os.getenv("CURRENT_WEATHER_CACHE_TTL", str(10 * 60)))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "5000"))
+
+_forecast_cache = TTLCache(maxsize=WEATHER_CACHE_MAX_ENTRIES, ttl=FORECAST_CACHE_TTL)
+_current_cache = TTLCache(maxsize=WEATHER_CACHE_MAX_ENTRIES, ttl=CURRENT_WEATHER_CACHE_TTL)
+
+
+def geo_cell(lat: float, lon: float) -> Tuple[float, float]:
+    """Snaps a coordinate to the centre of its grid cell."""
+    step = WEATHER_GRID_DEGREES
+    cell_lat = (math.floor(lat / step) + 0.5) * step
+    cell_lon = (math.floor(lon / step) + 0.5) * step
+    return round(cell_lat, 4), round(cell_lon, 4)
+
+
+async def _fetch(endpoint: str, lat: float, lon: float) -> dict:
+    params = {"lat": lat, "lon": lon, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+    response = await request_with_retry("openweather", "GET", f"{OPENWEATHER_BASE_URL}/{endpoint}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_forecast(lat: float, lon: float) -> dict:
+    """
+    Returns the OpenWeatherMap 5-day/3-hour forecast for the grid cell containing
+    (lat, lon). Raises httpx.HTTPStatusError if the provider rejects the request.
+    """
+    cell = geo_cell(lat, lon)
+    return await _forecast_cache.get_or_load(cell, lambda: _fetch("forecast", *cell))
+
+
+async def refresh_forecast(lat: float, lon: float) -> dict:
+    """Fetches the forecast for the grid cell from the provider, bypassing and then updating the cache."""
+    cell = geo_cell(lat, lon)
+    data = await _fetch("forecast", *cell)
+    _forecast_cache.set(cell, data)
+    return data
+
+
+async def fetch_current_weather(lat: float, lon: float) -> dict:
+    """Returns current conditions for the grid cell containing (lat, lon)."""
+    cell = geo_cell(lat, lon)
+    return await _current_cache.get_or_load(cell, lambda: _fetch("weather", *cell))
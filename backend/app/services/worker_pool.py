@@ -0,0 +1,65 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+
+class WorkerPool:
+    """
+    Process pool for CPU-bound work that holds the GIL or needs a model loaded
+    once per process (image classification, speech, password hashing).
+
+    Workers are spawned, not forked: the parent already runs the event loop and
+    other threads, whose state fork would copy into the children half-finished.
+    """
+
+    def __init__(self, name: str, max_workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.name = name
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    async def start(self, warm_up: Optional[Callable[[], Any]] = None) -> List[Any]:
+        """
+        Starts the workers. With `warm_up`, runs it once per worker so every
+        worker runs its initializer now rather than on the first request, and
+        returns the results. Does nothing and returns [] if already running.
+        """
+        async with self._lock:
+            if self._executor is not None:
+                return []
+            executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+            results = []
+            if warm_up is not None:
+                loop = asyncio.get_running_loop()
+                try:
+                    results = await asyncio.gather(
+                        *(loop.run_in_executor(executor, warm_up) for _ in range(self.max_workers))
+                    )
+                except BaseException:
+                    await asyncio.to_thread(executor.shutdown)
+                    raise
+            self._executor = executor
+            return results
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Runs `func(*args)` in a worker. Raises RuntimeError if the pool is not running."""
+        if self._executor is None:
+            raise RuntimeError(f"The {self.name} worker pool is not running.")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def stop(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown)
@@ -6,6 +6,14 @@ from typing import Optional
 
 security = HTTPBearer()
 
+async def resolve_user(token: str) -> Optional[UserResponse]:
+    """
+    Authenticates a token against the (briefly cached) Firebase Auth record, so
+    deleted, disabled and revoked accounts are refused by every worker.
+    Returns None if the account no longer exists; raises ValueError if the token is invalid.
+    """
+    return await firebase_auth_service.authenticate_token(token)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserResponse:
     """
     Dependency to get current authenticated user.
@@ -17,23 +25,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             return {"message": f"Hello {current_user.email}"}
     """
     try:
-        token = credentials.credentials
-        uid = firebase_auth_service.verify_token(token)
-        if not uid:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication token"
-            )
-        
-        user = firebase_auth_service.get_user_by_uid(uid)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        return user
-        
+        user = await resolve_user(credentials.credentials)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,22 +37,31 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Authentication failed"
         )
 
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
+
 async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))) -> Optional[UserResponse]:
     """
     Optional authentication dependency.
-    Returns user if valid token is provided, None otherwise.
+    Returns the user for a valid token and None when no token is sent.
+    A token that is sent but invalid or expired is rejected with 401.
     """
     if not credentials:
         return None
-    
+
     try:
-        token = credentials.credentials
-        uid = firebase_auth_service.verify_token(token)
-        if not uid:
-            return None
-        
-        user = firebase_auth_service.get_user_by_uid(uid)
-        return user
-        
-    except:
-        return None
+        return await resolve_user(credentials.credentials)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Authentication failed"
+        )
@@ -1,9 +1,94 @@
+import os
+import re
 from pathlib import Path
+from string import Formatter
+from typing import Dict, FrozenSet
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+# Re-read templates whose file changed since they were loaded (for local development)
+PROMPT_HOT_RELOAD = os.getenv("PROMPT_HOT_RELOAD", "false").lower() == "true"
+
+# Variables the calling code passes for each template. Checked against the
+# template files at startup so a mismatch fails the deploy, not a request.
+EXPECTED_VARIABLES: Dict[str, FrozenSet[str]] = {
+    "advisory_prompt": frozenset({"query", "weather_data", "market_data"}),
+    "disease_prompt": frozenset({"language"}),
+    "weather_advice_prompt": frozenset({"forecast_data", "location", "language", "response_format"}),
+}
+
+
+class PromptTemplate:
+    def __init__(self, name: str, path: Path):
+        self.name = name
+        self.path = path
+        self.mtime = path.stat().st_mtime
+        self.text = path.read_text()
+        self.variables = self._parse_variables(self.text)
+
+    def _parse_variables(self, text: str) -> FrozenSet[str]:
+        try:
+            fields = [field for _, field, _, _ in Formatter().parse(text) if field is not None]
+        except ValueError as e:
+            raise ValueError(f"Prompt '{self.name}' is not a valid template: {e}") from None
+        if any(field == "" or field.isdigit() for field in fields):
+            raise ValueError(f"Prompt '{self.name}' uses positional fields; use named variables")
+        # "{a.b}" and "{a[0]}" both need the variable "a"
+        return frozenset(re.split(r"[.\[]", field, maxsplit=1)[0] for field in fields)
+
+    def is_stale(self) -> bool:
+        try:
+            return self.path.stat().st_mtime != self.mtime
+        except FileNotFoundError:
+            return False
+
+    def render(self, **vars) -> str:
+        missing = self.variables - vars.keys()
+        if missing:
+            raise ValueError(f"Prompt '{self.name}' missing variable: {', '.join(sorted(missing))}")
+        return self.text.format(**vars)
+
+
+class PromptRegistry:
+    """Loads every template in the prompts directory once and renders them from memory."""
+
+    def __init__(self, directory: Path, hot_reload: bool = False):
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def load_all(self):
+        """Loads and validates every template. Raises ValueError on the first problem found."""
+        templates = {path.stem: PromptTemplate(path.stem, path) for path in sorted(self.directory.glob("*.txt"))}
+        for name, expected in EXPECTED_VARIABLES.items():
+            template = templates.get(name)
+            if template is None:
+                raise ValueError(f"Prompt '{name}' not found in {self.directory}")
+            if template.variables != expected:
+                raise ValueError(
+                    f"Prompt '{name}' variables {sorted(template.variables)} "
+                    f"do not match the expected {sorted(expected)}"
+                )
+        self._templates = templates
+
+    def get(self, name: str) -> PromptTemplate:
+        template = self._templates.get(name)
+        if template is None or (self.hot_reload and template.is_stale()):
+            path = self.directory / f"{name}.txt"
+            if not path.exists():
+                raise ValueError(f"Prompt '{name}' not found")
+            template = self._templates[name] = PromptTemplate(name, path)
+        return template
+
+    def render(self, name: str, **vars) -> str:
+        return self.get(name).render(**vars)
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR, hot_reload=PROMPT_HOT_RELOAD)
+
+
+def load_prompts():
+    prompt_registry.load_all()
+
 
 def render_prompt(name: str, **vars) -> str:
-    raw = (Path(__file__).parent.parent / "prompts" / f"{name}.txt").read_text()
-    try:
-        return raw.format(**vars)          # simple .format() version
-    except KeyError as e:
-        missing = e.args[0]
-        raise ValueError(f"Prompt '{name}' missing variable: {missing}") from None
\ No newline at end of file
+    return prompt_registry.render(name, **vars)
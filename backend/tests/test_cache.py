@@ -0,0 +1,174 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the cache's monotonic clock with one the test advances by hand."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_get_returns_value_until_ttl(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.value += 5
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1, ttl=60)
+    clock.value += 30
+    assert cache.get("a") == 1
+
+
+def test_evicts_least_recently_used_when_full(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_max_bytes_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10)
+    cache.set("a", b"xxxx")
+    cache.set("b", b"yyyy")
+    cache.get("a")
+    cache.set("c", b"zzzz")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"xxxx"
+    assert cache.total_bytes == 8
+
+
+def test_max_bytes_skips_oversized_values(clock):
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10)
+    cache.set("a", b"xxxx")
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"xxxx"
+    assert cache.total_bytes == 4
+
+
+def test_max_bytes_replacing_a_key_updates_total(clock):
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10)
+    cache.set("a", b"xxxx")
+    cache.set("a", b"xx")
+    assert cache.total_bytes == 2
+    cache.invalidate("a")
+    assert cache.total_bytes == 0
+
+
+def test_get_or_load_coalesces_concurrent_misses(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == 1
+    assert cache.get("k") == "value"
+
+
+def test_get_or_load_survives_a_cancelled_caller(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    async def main():
+        started = asyncio.Event()
+        done = asyncio.Event()
+
+        async def loader():
+            started.set()
+            await done.wait()
+            return "value"
+
+        first = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await started.wait()
+        second = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        done.set()
+        return await second
+
+    assert asyncio.run(main()) == "value"
+    assert cache.get("k") == "value"
+
+
+def test_failed_load_is_not_cached(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    results = iter([RuntimeError("upstream down"), "value"])
+
+    async def loader():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", loader)
+        return await cache.get_or_load("k", loader)
+
+    assert asyncio.run(main()) == "value"
+
+
+def test_stale_entry_is_served_while_refreshing(clock):
+    cache = TTLCache(maxsize=10, ttl=10, stale_ttl=60)
+    cache.set("k", "old")
+    clock.value += 15
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return "new"
+
+    async def main():
+        # Stale entries are not returned by get(), only by get_or_load()
+        assert cache.get("k") is None
+        assert await cache.get_or_load("k", loader) == "old"
+        assert await cache.get_or_load("k", loader) == "old"
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return await cache.get_or_load("k", loader)
+
+    assert asyncio.run(main()) == "new"
+    assert calls == 1
+
+
+def test_entry_past_stale_window_is_reloaded(clock):
+    cache = TTLCache(maxsize=10, ttl=10, stale_ttl=60)
+    cache.set("k", "old")
+    clock.value += 70
+
+    async def loader():
+        return "new"
+
+    assert asyncio.run(cache.get_or_load("k", loader)) == "new"
+
+
+def test_keys_lists_only_fresh_entries(clock):
+    cache = TTLCache(maxsize=10, ttl=10, stale_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=100)
+    clock.value += 20
+    assert cache.keys() == ["b"]
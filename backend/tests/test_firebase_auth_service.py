@@ -0,0 +1,128 @@
+import asyncio
+import importlib
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+firebase_admin = pytest.importorskip("firebase_admin")
+firebase_credentials = pytest.importorskip("firebase_admin.credentials")
+firebase_firestore = pytest.importorskip("firebase_admin.firestore")
+jwt = pytest.importorskip("jwt")
+
+UID = "farmer-1"
+
+
+@pytest.fixture(scope="module")
+def service_module():
+    """Imports the service against a stubbed Firebase project."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("FIREBASE_PRIVATE_KEY", "test-key")
+        mp.setattr(firebase_admin, "_apps", {})
+        mp.setattr(firebase_admin, "initialize_app", lambda *args, **kwargs: None)
+        mp.setattr(firebase_credentials, "Certificate", lambda config: config)
+        mp.setattr(firebase_firestore, "client", lambda *args, **kwargs: object())
+        sys.modules.pop("app.services.firebase_auth_service", None)
+        module = importlib.import_module("app.services.firebase_auth_service")
+        mp.setattr(module, "JWT_SECRET_KEY", "0123456789abcdef0123456789abcdef")
+        yield module
+    sys.modules.pop("app.services.firebase_auth_service", None)
+
+
+@pytest.fixture
+def account(service_module, monkeypatch):
+    """The Firebase Auth record for UID, and a count of lookups made against it."""
+    record = SimpleNamespace(
+        uid=UID,
+        email="farmer@example.com",
+        display_name="Farmer",
+        phone_number=None,
+        email_verified=True,
+        user_metadata=SimpleNamespace(creation_timestamp=1_700_000_000_000),
+        disabled=False,
+        tokens_valid_after_timestamp=None,
+        lookups=0,
+        deleted=False,
+    )
+
+    def get_user(uid):
+        record.lookups += 1
+        if uid != UID or record.deleted:
+            raise service_module.auth.UserNotFoundError(f"No user record found for {uid}")
+        return record
+
+    monkeypatch.setattr(service_module.auth, "get_user", get_user)
+    return record
+
+
+@pytest.fixture
+def service(service_module, account):
+    return service_module.FirebaseAuthService()
+
+
+def _authenticate(service, token):
+    return asyncio.run(service.authenticate_token(token))
+
+
+def test_valid_token_returns_the_user(service, account):
+    user = _authenticate(service, service.create_custom_token(UID))
+    assert user.uid == UID
+    assert user.email == "farmer@example.com"
+
+
+def test_auth_record_is_cached_between_requests(service, account):
+    token = service.create_custom_token(UID)
+    _authenticate(service, token)
+    _authenticate(service, token)
+    assert account.lookups == 1
+
+
+def test_disabled_account_is_rejected(service, account):
+    account.disabled = True
+    with pytest.raises(ValueError, match="disabled"):
+        _authenticate(service, service.create_custom_token(UID))
+
+
+def test_token_issued_before_revocation_is_rejected(service, account):
+    token = service.create_custom_token(UID)
+    account.tokens_valid_after_timestamp = int((time.time() + 1) * 1000)
+    with pytest.raises(ValueError, match="revoked"):
+        _authenticate(service, token)
+
+
+def test_token_issued_after_revocation_is_accepted(service, account):
+    account.tokens_valid_after_timestamp = int((time.time() - 1) * 1000)
+    assert _authenticate(service, service.create_custom_token(UID)).uid == UID
+
+
+def test_revocation_applies_once_the_cached_record_is_refreshed(service, account):
+    token = service.create_custom_token(UID)
+    _authenticate(service, token)
+    account.tokens_valid_after_timestamp = int((time.time() + 1) * 1000)
+    service.invalidate_user(UID)
+    with pytest.raises(ValueError, match="revoked"):
+        _authenticate(service, token)
+
+
+def test_deleted_account_resolves_to_no_user(service, account):
+    account.deleted = True
+    assert _authenticate(service, service.create_custom_token(UID)) is None
+
+
+def test_expired_token_is_rejected(service, service_module):
+    issued = datetime.utcnow() - timedelta(hours=2)
+    token = jwt.encode(
+        {"uid": UID, "iat": issued, "exp": issued + timedelta(hours=1)},
+        service_module.JWT_SECRET_KEY,
+        algorithm=service_module.JWT_ALGORITHM,
+    )
+    with pytest.raises(ValueError, match="expired"):
+        _authenticate(service, token)
+
+
+def test_token_signed_with_another_key_is_rejected(service, service_module):
+    token = jwt.encode({"uid": UID}, "another-key-another-key-another-key", algorithm=service_module.JWT_ALGORITHM)
+    with pytest.raises(ValueError, match="Invalid token"):
+        _authenticate(service, token)
@@ -0,0 +1,74 @@
+from app.services.image_index import ImageIndex
+
+SHA_A = "a" * 64
+SHA_B = "b" * 64
+SHA_C = "c" * 64
+
+
+def _index(**overrides) -> ImageIndex:
+    params = {"maxsize": 10, "phash_threshold": 4, "diagnosis_ttl": 60, "max_bytes": 100}
+    params.update(overrides)
+    return ImageIndex(**params)
+
+
+def test_find_identical_content():
+    index = _index()
+    entry = index.add(SHA_A, 0b1010, "https://cdn/a.webp")
+    assert index.find(SHA_A, 0) is entry
+
+
+def test_find_near_duplicate_within_threshold():
+    index = _index()
+    entry = index.add(SHA_A, 0, "https://cdn/a.webp")
+    assert index.find(SHA_B, 0b1111) is entry
+    assert index.find(SHA_B, 0b11111) is None
+
+
+def test_find_prefers_the_closest_near_duplicate():
+    index = _index()
+    index.add(SHA_A, 0b0111, "https://cdn/a.webp")
+    closest = index.add(SHA_B, 0b0001, "https://cdn/b.webp")
+    assert index.find(SHA_C, 0) is closest
+
+
+def test_least_recently_found_entry_is_evicted():
+    index = _index(maxsize=2)
+    index.add(SHA_A, 0, "https://cdn/a.webp")
+    index.add(SHA_B, 2 ** 64 - 1, "https://cdn/b.webp")
+    index.find(SHA_A, 0)
+    index.add(SHA_C, 2 ** 32 - 1, "https://cdn/c.webp")
+
+    assert index.find(SHA_B, 2 ** 64 - 1) is None
+    assert index.find(SHA_A, 0) is not None
+    assert index.sha_for_url("https://cdn/b.webp") is None
+
+
+def test_sha_for_url_remembers_resolved_urls():
+    index = _index()
+    index.set_url("https://example.com/leaf.jpg", SHA_A)
+    assert index.sha_for_url("https://example.com/leaf.jpg") == SHA_A
+    assert index.sha_for_url("https://example.com/other.jpg") is None
+
+
+def test_sha_for_url_reads_content_addressed_names():
+    index = _index()
+    url = f"https://storage.googleapis.com/bucket/uploads/{SHA_A}.webp?X-Goog-Signature=abc"
+    assert index.sha_for_url(url) == SHA_A
+
+
+def test_image_bytes_are_bounded_by_total_size():
+    index = _index(max_bytes=10)
+    index.set_bytes(SHA_A, b"x" * 6, "image/webp")
+    index.set_bytes(SHA_B, b"y" * 6, "image/webp")
+    index.set_bytes(SHA_C, b"z" * 11, "image/webp")
+
+    assert index.get_bytes(SHA_A) is None
+    assert index.get_bytes(SHA_B) == (b"y" * 6, "image/webp")
+    assert index.get_bytes(SHA_C) is None
+
+
+def test_diagnoses_are_kept_per_language():
+    index = _index()
+    index.set_diagnosis(SHA_A, "en", {"disease": "Leaf blight"})
+    assert index.get_diagnosis(SHA_A, "en") == {"disease": "Leaf blight"}
+    assert index.get_diagnosis(SHA_A, "hi") is None
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.services.image_processing import (
+    IMAGE_MAX_DIMENSION,
+    OUTPUT_TYPES,
+    IMAGE_OUTPUT_FORMAT,
+    perceptual_hash,
+    preprocess_image,
+    preprocess_image_async,
+)
+
+IMAGES = os.path.join(os.path.dirname(__file__), "images")
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(IMAGES, name), "rb") as f:
+        return f.read()
+
+
+def _encode(image: Image.Image, format: str, **params) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format=format, **params)
+    return output.getvalue()
+
+
+def test_large_photo_is_downsampled_and_reencoded():
+    processed = preprocess_image(_read("moneyplant.webp"))
+
+    assert max(processed.width, processed.height) == IMAGE_MAX_DIMENSION
+    assert processed.width / processed.height == pytest.approx(1440 / 810, rel=0.01)
+    assert (processed.content_type, processed.extension) == OUTPUT_TYPES[IMAGE_OUTPUT_FORMAT]
+    assert processed.sha256 == hashlib.sha256(processed.data).hexdigest()
+    with Image.open(io.BytesIO(processed.data)) as decoded:
+        assert decoded.format == IMAGE_OUTPUT_FORMAT
+        assert decoded.size == (processed.width, processed.height)
+
+
+def test_small_photo_keeps_its_size():
+    processed = preprocess_image(_read("badhealth.jpeg"))
+    assert (processed.width, processed.height) == (141, 134)
+
+
+def test_avif_upload_is_decoded():
+    name = next(f for f in os.listdir(IMAGES) if f.endswith(".avif"))
+    processed = preprocess_image(_read(name))
+    assert (processed.width, processed.height) == (820, 410)
+
+
+def test_file_object_gives_the_same_result_as_bytes():
+    data = _read("download.jpeg")
+    assert preprocess_image(io.BytesIO(data)) == preprocess_image(data)
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees clockwise
+    data = _encode(Image.new("RGB", (200, 100), "green"), "JPEG", exif=exif)
+
+    processed = preprocess_image(data)
+    assert (processed.width, processed.height) == (100, 200)
+
+
+def test_metadata_is_stripped():
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    processed = preprocess_image(_encode(Image.new("RGB", (64, 64), "green"), "JPEG", exif=exif))
+
+    with Image.open(io.BytesIO(processed.data)) as decoded:
+        assert not decoded.getexif()
+
+
+def test_transparency_is_flattened_onto_white():
+    image = Image.new("RGBA", (32, 32), (0, 0, 0, 0))
+    processed = preprocess_image(_encode(image, "PNG"))
+
+    with Image.open(io.BytesIO(processed.data)) as decoded:
+        assert decoded.convert("RGB").getpixel((16, 16)) >= (250, 250, 250)
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", _encode(Image.new("RGB", (64, 64)), "PNG")[:40]])
+def test_unsupported_data_raises_value_error(data):
+    with pytest.raises(ValueError):
+        preprocess_image(data)
+
+
+def test_async_preprocess_matches_sync():
+    data = _read("badhealth.jpeg")
+    assert asyncio.run(preprocess_image_async(data)) == preprocess_image(data)
+
+
+def test_perceptual_hash_survives_reencoding_and_resizing():
+    original = Image.open(io.BytesIO(_read("moneyplant.webp"))).convert("RGB")
+    copy = Image.open(io.BytesIO(_encode(original.resize((720, 405)), "JPEG", quality=60)))
+
+    assert (perceptual_hash(original) ^ perceptual_hash(copy)).bit_count() <= 4
+
+
+def test_perceptual_hash_separates_different_photos():
+    first = Image.open(io.BytesIO(_read("badhealth.jpeg")))
+    second = Image.open(io.BytesIO(_read("download.jpeg")))
+
+    assert (perceptual_hash(first) ^ perceptual_hash(second)).bit_count() > 10
+    assert 0 <= perceptual_hash(first) < 2 ** 64
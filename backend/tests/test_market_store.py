@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from datetime import date
+
+import pytest
+
+from app.services import market_store
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """Points the store at a fresh database file."""
+    monkeypatch.setattr(market_store, "MARKET_DB_PATH", str(tmp_path / "prices.db"))
+    monkeypatch.setattr(market_store, "_local", threading.local())
+    monkeypatch.setattr(market_store, "_schema_ready", False)
+    monkeypatch.setattr(market_store, "_store_ready", False)
+    return market_store
+
+
+def _record(market, arrival_date, modal_price, variety="Red", grade="FAQ"):
+    return {
+        "state": "Maharashtra",
+        "district": "Pune",
+        "market": market,
+        "commodity": "Onion",
+        "variety": variety,
+        "grade": grade,
+        "arrival_date": arrival_date,
+        "min_price": "1500",
+        "max_price": "2500",
+        "modal_price": modal_price,
+    }
+
+
+def test_latest_prices_round_trip_the_api_record(store):
+    record = _record("Pune", "02/10/2026", "2000")
+    store._write_records([_record("Pune", "01/10/2026", "1900"), record])
+
+    assert asyncio.run(store.get_latest_prices(" maharashtra", "PUNE", "pune", "onion")) == [record]
+
+
+def test_records_without_a_valid_date_are_skipped(store):
+    assert store._write_records([_record("Pune", "2026-10-02", "2000"), _record("Pune", "02/10/2026", "2000")]) == 1
+
+
+def test_rewriting_a_day_replaces_its_price(store):
+    store._write_records([_record("Pune", "02/10/2026", "2000")])
+    store._write_records([_record("Pune", "02/10/2026", "2100")])
+
+    latest = asyncio.run(store.get_latest_prices("Maharashtra", "Pune", "Pune", "Onion"))
+    assert [r["modal_price"] for r in latest] == ["2100"]
+
+
+def test_price_history_averages_varieties_per_day(store):
+    store._write_records([
+        _record("Pune", "01/10/2026", "2000", variety="Red"),
+        _record("Pune", "01/10/2026", "2200", variety="White"),
+        _record("Pune", "02/10/2026", "", variety="Red"),
+        _record("Baramati", "02/10/2026", "1900"),
+        _record("Baramati", "20/09/2026", "1700"),
+    ])
+    history = asyncio.run(store.get_price_history("Maharashtra", "Pune", "Onion", date(2026, 10, 1)))
+
+    assert history["market"].tolist() == ["Baramati", "Pune"]
+    assert [str(d) for d in history["date"]] == ["2026-10-02", "2026-10-01"]
+    assert history["modal_price"].tolist() == [1900.0, 2100.0]
+
+
+def test_price_history_when_empty(store):
+    history = asyncio.run(store.get_price_history("Maharashtra", "Pune", "Onion", date(2026, 10, 1)))
+    assert all(column.size == 0 for column in history.values())
+    assert not asyncio.run(store.store_has_data())
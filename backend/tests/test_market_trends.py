@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from app.services.market_trends import compute_trends, rolling_mean, summarize_trends_for_llm, volatility_pct
+
+
+def _history(rows):
+    markets, dates, prices = zip(*rows)
+    return {
+        "market": np.array(markets, dtype=str),
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "modal_price": np.array(prices, dtype=np.float64),
+    }
+
+
+def test_rolling_mean_averages_available_points_at_the_start():
+    values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    np.testing.assert_allclose(rolling_mean(values, 3), [1.0, 1.5, 2.0, 3.0, 4.0])
+
+
+def test_rolling_mean_of_empty_series():
+    assert rolling_mean(np.array([], dtype=np.float64), 7).size == 0
+
+
+def test_volatility_pct_is_std_of_log_returns():
+    values = np.array([100.0, 110.0, 99.0, 108.9])
+    expected = np.std(np.diff(np.log(values)), ddof=1) * 100
+    assert volatility_pct(values) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("values", [[100.0, 110.0], [100.0, 0.0, 120.0]])
+def test_volatility_pct_needs_three_positive_prices(values):
+    assert volatility_pct(np.array(values)) is None
+
+
+def test_compute_trends_for_selected_market():
+    history = _history([
+        ("Baramati", "2026-10-01", 1800.0),
+        ("Baramati", "2026-10-03", 1900.0),
+        ("Pune", "2026-10-01", 2000.0),
+        ("Pune", "2026-10-02", 2200.0),
+        ("Pune", "2026-10-03", 2100.0),
+    ])
+    trends = compute_trends(history, " pune ", window=2)
+
+    assert trends["start_date"] == "2026-10-01"
+    assert trends["end_date"] == "2026-10-03"
+    assert trends["latest_modal_price"] == 2100.0
+    assert trends["average_modal_price"] == 2100.0
+    assert trends["rolling_avg"] == 2150.0
+    assert trends["change_pct"] == 5.0
+    assert trends["volatility_pct"] is not None
+    assert [point["rolling_avg"] for point in trends["series"]] == [2000.0, 2100.0, 2150.0]
+    assert trends["nearby_markets"] == [{
+        "market": "Baramati",
+        "latest_modal_price": 1900.0,
+        "average_modal_price": 1850.0,
+        "diff_from_selected_pct": -9.52,
+    }]
+
+
+def test_compute_trends_for_unknown_market():
+    history = _history([("Pune", "2026-10-01", 2000.0)])
+    assert compute_trends(history, "Nashik", window=7) == {"series": [], "nearby_markets": []}
+
+
+def test_summary_omits_figures_a_short_history_cannot_support():
+    history = _history([("Pune", "2026-10-01", 0.0), ("Pune", "2026-10-02", 2000.0)])
+    summary = summarize_trends_for_llm(compute_trends(history, "Pune", window=7), "Pune", "Onion")
+
+    assert "None" not in summary
+    assert "volatility" not in summary
+    assert "change" not in summary
+    assert summary.startswith("Onion at Pune: latest modal price Rs 2000.0/quintal (2026-10-02)")
+
+
+def test_summary_lists_nearby_markets():
+    history = _history([
+        ("Baramati", "2026-10-02", 1900.0),
+        ("Pune", "2026-10-01", 2000.0),
+        ("Pune", "2026-10-02", 2100.0),
+        ("Pune", "2026-10-03", 2000.0),
+    ])
+    summary = summarize_trends_for_llm(compute_trends(history, "Pune", window=7), "Pune", "Onion")
+    assert "change 0.0% since 2026-10-01" in summary
+    assert "volatility" in summary
+    assert summary.endswith("Nearby markets: Baramati Rs 1900.0 (-5.0%).")
+
+
+def test_summary_without_data():
+    assert summarize_trends_for_llm({"series": []}, "Pune", "Onion") == "No recent price data for Onion at Pune."
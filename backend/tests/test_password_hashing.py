@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.services.password_hashing import hash_password, stop_password_hashing, verify_password
+
+
+@pytest.fixture(scope="module", autouse=True)
+def worker_pool():
+    yield
+    asyncio.run(stop_password_hashing())
+
+
+def test_hash_verifies_only_the_original_password():
+    async def main():
+        password_hash = await hash_password("kisan@123")
+        return password_hash, await verify_password("kisan@123", password_hash), await verify_password("kisan@124", password_hash)
+
+    password_hash, right, wrong = asyncio.run(main())
+    assert password_hash.startswith("$2")
+    assert "kisan@123" not in password_hash
+    assert right and not wrong
+
+
+def test_hashes_are_salted():
+    async def main():
+        return await asyncio.gather(hash_password("same"), hash_password("same"))
+
+    first, second = asyncio.run(main())
+    assert first != second
+
+
+def test_malformed_hash_does_not_verify():
+    assert asyncio.run(verify_password("kisan@123", "not-a-bcrypt-hash")) is False
@@ -0,0 +1,86 @@
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from app.services.structured_output import JSONStreamParser, extract_json, parse_model
+
+
+class Advice(BaseModel):
+    summary: str
+    actions: List[str]
+
+
+def test_extracts_object_from_prose_and_code_fence():
+    text = 'Here is the advice:\n```json\n{"summary": "Irrigate", "actions": ["water at dawn"]}\n```\nGood luck!'
+    assert extract_json(text) == {"summary": "Irrigate", "actions": ["water at dawn"]}
+
+
+def test_extracts_top_level_array():
+    assert extract_json("Result: [1, 2, {\"a\": [3]}] done") == [1, 2, {"a": [3]}]
+
+
+def test_drops_trailing_commas():
+    assert extract_json('{"a": [1, 2,], "b": {"c": 3,},}') == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_brackets_inside_strings_are_ignored():
+    text = '{"summary": "use {neem} oil [5 ml/l], then \\"wait\\"", "actions": []}'
+    assert extract_json(text) == {"summary": 'use {neem} oil [5 ml/l], then "wait"', "actions": []}
+
+
+def test_returns_only_the_first_json_block():
+    assert extract_json('{"a": 1} and then {"b": 2}') == {"a": 1}
+
+
+def test_brace_in_prose_before_the_json_is_skipped():
+    text = 'Apply {as needed} the mix. {"summary": "Spray", "actions": ["neem"]}'
+    assert extract_json(text) == {"summary": "Spray", "actions": ["neem"]}
+
+
+def test_mismatched_bracket_is_skipped():
+    assert extract_json('see [note} {"a": 1}') == {"a": 1}
+
+
+def test_unclosed_bracket_is_skipped_at_close():
+    assert extract_json('Costs [approx. Rs 200 {"a": 1}') == {"a": 1}
+
+
+def test_no_json_raises_value_error():
+    with pytest.raises(ValueError):
+        extract_json("No structured answer today {really")
+
+
+def test_feed_returns_result_once_the_closing_bracket_arrives():
+    parser = JSONStreamParser()
+    text = 'Sure! {"summary": "Harvest", "actions": ["dry the grain", "store in bags"]}'
+    head = text[:-1]
+    assert all(parser.feed(head[i:i + 5]) is None for i in range(0, len(head), 5))
+    assert parser.feed(text[-1]) == {"summary": "Harvest", "actions": ["dry the grain", "store in bags"]}
+    assert parser.done
+    # Input after the first complete block is ignored
+    assert parser.feed(' {"b": 2}') == {"summary": "Harvest", "actions": ["dry the grain", "store in bags"]}
+
+
+def test_chunked_feed_retries_across_chunk_boundaries():
+    parser = JSONStreamParser()
+    for chunk in ["{not json", "} then ", '{"a"', ": 1}"]:
+        parser.feed(chunk)
+    assert parser.result == {"a": 1}
+
+
+def test_parse_model_accepts_plain_json_mode_output():
+    advice = parse_model('{"summary": "Irrigate", "actions": []}', Advice)
+    assert advice == Advice(summary="Irrigate", actions=[])
+
+
+def test_parse_model_falls_back_to_extraction():
+    advice = parse_model('Advice: {"summary": "Irrigate", "actions": ["today",],}', Advice)
+    assert advice.actions == ["today"]
+
+
+def test_parse_model_rejects_arrays_and_missing_fields():
+    with pytest.raises(ValueError):
+        parse_model("[1, 2]", Advice)
+    with pytest.raises(ValueError, match="Incomplete AI response structure"):
+        parse_model('{"summary": "Irrigate"}', Advice)
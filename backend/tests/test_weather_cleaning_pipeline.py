@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services.weather_cleaning_pipeline import clean_weather_data, daily_summary, summarize_forecast
+
+IST = 5 * 3600 + 30 * 60
+# Local midnight of 18 Oct 2026 in India
+START = int(datetime(2026, 10, 18, tzinfo=timezone(timedelta(seconds=IST))).timestamp())
+
+
+def _entry(slot, temp, rain=0.0, wind=2.0, humidity=None, gust=None, description="clear sky"):
+    entry = {
+        "dt": START + slot * 3 * 3600,
+        "main": {"temp": temp, "feels_like": temp, "pressure": 1010},
+        "wind": {"speed": wind},
+        "weather": [{"description": description}],
+    }
+    if rain:
+        entry["rain"] = {"3h": rain}
+    if humidity is not None:
+        entry["main"]["humidity"] = humidity
+    if gust is not None:
+        entry["wind"]["gust"] = gust
+    return entry
+
+
+def _forecast():
+    temps = [20, 22, 28, 34, 36, 30, 25, 22]
+    humidity = [80, 70, 60, 50, 40, 50, 60, 70]
+    first_day = [
+        _entry(slot, temps[slot], humidity=humidity[slot],
+               rain=2.0 if slot == 5 else 0.0,
+               gust=6.5 if slot == 4 else None,
+               description="light rain" if slot >= 5 else "clear sky")
+        for slot in range(8)
+    ]
+    second_day = [_entry(slot, 24, rain=10.0, wind=5.0, description="moderate rain") for slot in range(8, 16)]
+    return first_day + second_day
+
+
+def test_clean_weather_data_builds_typed_local_time_columns():
+    columns = clean_weather_data(_forecast(), IST)
+
+    assert columns.time[0] == np.datetime64("2026-10-18T00:00:00")
+    assert columns.time[-1] == np.datetime64("2026-10-19T21:00:00")
+    assert columns.temperature.dtype == np.float64
+    assert columns.rain[:6].tolist() == [0, 0, 0, 0, 0, 2.0]
+    assert np.isnan(columns.humidity[8])
+    assert columns.wind_gust[4] == 6.5 and columns.wind_gust[0] == 0
+    assert columns.condition[0] == "clear sky"
+
+
+def test_clean_weather_data_tolerates_missing_sections():
+    columns = clean_weather_data([{"dt": START}], 0)
+    assert np.isnan(columns.temperature[0])
+    assert columns.rain[0] == 0 and columns.wind_speed[0] == 0
+    assert columns.condition[0] == "N/A"
+
+
+def test_daily_summary_aggregates_per_local_day():
+    first, second = daily_summary(clean_weather_data(_forecast(), IST))
+
+    assert first == {
+        "date": date(2026, 10, 18),
+        "temp_min_C": 20.0,
+        "temp_max_C": 36.0,
+        "rain_mm": 2.0,
+        "humidity_%": 60,
+        "wind_max_mps": 2.0,
+        "gust_max_mps": 6.5,
+        "condition": "clear sky",
+        "heat_stress": True,
+        "heavy_rain": False,
+        "spray_windows": ["06:00", "18:00"],
+    }
+    assert second["date"] == date(2026, 10, 19)
+    assert second["rain_mm"] == 80.0
+    assert second["heavy_rain"] and not second["heat_stress"]
+    assert second["humidity_%"] is None
+    assert second["spray_windows"] == []
+
+
+def test_day_boundaries_follow_the_timezone_offset():
+    # The same instants grouped in UTC straddle three days
+    days = [day["date"] for day in daily_summary(clean_weather_data(_forecast(), 0))]
+    assert days == [date(2026, 10, 17), date(2026, 10, 18), date(2026, 10, 19)]
+
+
+def test_summarize_forecast_renders_one_line_per_day():
+    lines = summarize_forecast({"city": {"timezone": IST}, "list": _forecast()}).splitlines()
+
+    assert lines == [
+        "Sun 18 Oct: Clear sky, 20.0-36.0°C, rain 2.0mm, humidity 60%, "
+        "wind up to 2.0 m/s (gusts 6.5), HEAT STRESS, spray windows 06:00 18:00.",
+        "Mon 19 Oct: Moderate rain, 24.0-24.0°C, rain 80.0mm, wind up to 5.0 m/s, "
+        "HEAVY RAIN, no spray window.",
+    ]
+
+
+def test_empty_forecast():
+    assert daily_summary(clean_weather_data([], 0)) == []
+    assert summarize_forecast({}) == ""